@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from utils.config_loader import (
+    ENVIRONMENT,
+    API_KEY_PASSPHRASE,
+    API_KEY_PEPPER,
+    API_KEYS_BACKEND,
+    API_KEYS_DB_NAME,
+    API_KEYS_COLLECTION_NAME,
+    API_KEYS_REFRESH_SECONDS,
+)
+
+
+ALL_SCOPES = "*"
+
+
+@dataclass(frozen=True)
+class ApiKeyIdentity:
+    """Who a request authenticated as. Set on request.state.api_key."""
+
+    key_id: str
+    tenant: str
+    scopes: FrozenSet[str]
+
+    def has_scopes(self, *scopes: str) -> bool:
+        return ALL_SCOPES in self.scopes or self.scopes.issuperset(scopes)
+
+
+@dataclass(frozen=True)
+class ApiKeyRecord:
+    key_hash: str
+    identity: ApiKeyIdentity
+    expires_at: Optional[float] = None  # epoch seconds
+
+
+# Used when API_KEY_PASSPHRASE is set, so single-key setups keep working
+PASSPHRASE_IDENTITY = ApiKeyIdentity(key_id="passphrase", tenant="default", scopes=frozenset({ALL_SCOPES}))
+
+
+def hash_key(raw_key: str) -> str:
+    """
+    HMAC-SHA256 of the key with API_KEY_PEPPER. Keys are random and long, so
+    a fast keyed hash is enough; a leaked table is useless without the pepper.
+    """
+    return hmac.new(API_KEY_PEPPER.encode("utf-8"), raw_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def generate_api_key() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def _expiry(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        # aiomysql and pymongo return naive datetimes holding UTC; .timestamp() would read them as local time
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class MongoKeyStore:
+    """Keys in a Mongo collection: {_id: key_id, tenant, key_hash, scopes, revoked, expires_at}."""
+
+    def __init__(self, db_name: str, collection_name: str):
+        self.db_name = db_name
+        self.collection_name = collection_name
+
+    async def _collection(self):
+        from database.mongo import get_collection
+
+        return await get_collection(self.db_name, self.collection_name)
+
+    async def setup(self):
+        collection = await self._collection()
+        await collection.create_index("key_hash", unique=True)
+
+    async def load(self) -> List[ApiKeyRecord]:
+        collection = await self._collection()
+        records = []
+        async for document in collection.find({"revoked": {"$ne": True}}):
+            identity = ApiKeyIdentity(
+                key_id=str(document["_id"]),
+                tenant=document.get("tenant", "default"),
+                scopes=frozenset(document.get("scopes", [])),
+            )
+            records.append(ApiKeyRecord(document["key_hash"], identity, _expiry(document.get("expires_at"))))
+        return records
+
+    async def add(self, identity: ApiKeyIdentity, key_hash: str, expires_at: Optional[datetime] = None):
+        collection = await self._collection()
+        await collection.insert_one({
+            "_id": identity.key_id,
+            "tenant": identity.tenant,
+            "key_hash": key_hash,
+            "scopes": sorted(identity.scopes),
+            "revoked": False,
+            "expires_at": expires_at,
+        })
+
+    async def revoke(self, key_id: str):
+        collection = await self._collection()
+        await collection.update_one({"_id": key_id}, {"$set": {"revoked": True}})
+
+
+class MySQLKeyStore:
+    """Keys in the api_keys table (models/api_key.py)."""
+
+    async def setup(self):
+        from database.mysql_main_db import get_engine
+        from models.api_key import ApiKey
+
+        async with get_engine().begin() as conn:
+            await conn.run_sync(ApiKey.__table__.create, checkfirst=True)
+
+    async def load(self) -> List[ApiKeyRecord]:
+        from sqlalchemy import select
+        from database.mysql_main_db import get_session
+        from models.api_key import ApiKey
+
+        async with get_session(read_only=True) as session:
+            rows = (await session.execute(select(ApiKey).where(ApiKey.revoked.is_(False)))).scalars().all()
+        return [
+            ApiKeyRecord(
+                row.key_hash,
+                ApiKeyIdentity(key_id=row.key_id, tenant=row.tenant, scopes=frozenset((row.scopes or "").split())),
+                _expiry(row.expires_at),
+            )
+            for row in rows
+        ]
+
+    async def add(self, identity: ApiKeyIdentity, key_hash: str, expires_at: Optional[datetime] = None):
+        from database.mysql_main_db import get_session
+        from models.api_key import ApiKey
+
+        async with get_session() as session:
+            session.add(ApiKey(
+                key_id=identity.key_id,
+                tenant=identity.tenant,
+                key_hash=key_hash,
+                scopes=" ".join(sorted(identity.scopes)),
+                revoked=False,
+                expires_at=expires_at,
+            ))
+            await session.commit()
+
+    async def revoke(self, key_id: str):
+        from sqlalchemy import update
+        from database.mysql_main_db import get_session
+        from models.api_key import ApiKey
+
+        async with get_session() as session:
+            await session.execute(update(ApiKey).where(ApiKey.key_id == key_id).values(revoked=True))
+            await session.commit()
+
+
+class ApiKeyIndex:
+    """
+    In-memory map of key hash -> identity, used by APIKeyMiddleware.
+
+    authenticate() hashes the presented key and does one dict lookup plus a
+    constant-time compare; it never touches the database. The map is
+    reloaded from the store every `refresh_interval` seconds by a background
+    task, and immediately after invalidate() (e.g. on revocation). If a
+    reload fails the previous map stays in use.
+    """
+
+    def __init__(self, store=None, refresh_interval: float = API_KEYS_REFRESH_SECONDS,
+                 passphrase: Optional[str] = API_KEY_PASSPHRASE):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.passphrase = passphrase.encode("utf-8") if passphrase else None
+        self._records: Dict[str, ApiKeyRecord] = {}
+        self._refresh_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+
+    def replace(self, records: Iterable[ApiKeyRecord]):
+        # Build a new dict and swap it in; readers never see a half-built map
+        self._records = {record.key_hash: record for record in records}
+        self.loaded_at = time.time()
+
+    def authenticate(self, api_key: Optional[bytes]) -> Optional[ApiKeyIdentity]:
+        if not api_key:
+            return None
+        if self.passphrase is not None and hmac.compare_digest(api_key, self.passphrase):
+            return PASSPHRASE_IDENTITY
+        if not self._records:
+            return None
+        digest = hash_key(api_key.decode("latin-1"))
+        record = self._records.get(digest)
+        if record is None or not hmac.compare_digest(record.key_hash, digest):
+            return None
+        if record.expires_at is not None and record.expires_at <= time.time():
+            return None
+        return record.identity
+
+    def forget(self, key_id: str):
+        """Drop a key from this process's map right away, ahead of the next reload."""
+        self.replace(record for record in self._records.values() if record.identity.key_id != key_id)
+
+    def invalidate(self):
+        """Ask the background task to reload now."""
+        self._refresh_requested.set()
+
+    async def refresh(self):
+        try:
+            self.replace(await self.store.load())
+        except Exception as ex:
+            print(f"API key refresh failed, keeping {len(self._records)} cached keys: {ex}")
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._refresh_requested.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_requested.clear()
+            await self.refresh()
+
+    async def start(self):
+        if self.store is None or self._task is not None:
+            return
+        await self.store.setup()
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def build_key_store(backend: str = API_KEYS_BACKEND):
+    """Store named by API_KEYS_BACKEND: "none" (passphrase only), "mongo" or "mysql"."""
+    if backend == "none":
+        return None
+    if backend == "mongo":
+        return MongoKeyStore(API_KEYS_DB_NAME, API_KEYS_COLLECTION_NAME)
+    if backend == "mysql":
+        return MySQLKeyStore()
+    raise ValueError(f"API_KEYS_BACKEND must be 'none', 'mongo' or 'mysql', got {backend!r}")
+
+
+api_key_index = ApiKeyIndex(build_key_store())
+
+
+async def create_api_key(tenant: str, scopes: Iterable[str] = (), expires_at: Optional[datetime] = None,
+                         index: ApiKeyIndex = api_key_index) -> Tuple[str, ApiKeyIdentity]:
+    """
+    Create a key in the configured store and return (raw key, identity). The
+    raw key is only available here; the store keeps its hash. A naive
+    `expires_at` is taken as UTC.
+    """
+    if index.store is None:
+        raise ValueError("API_KEYS_BACKEND is 'none'; there is no key store to add keys to.")
+    if expires_at is not None and expires_at.tzinfo is not None:
+        # Both stores keep naive UTC (MySQL DATETIME has no time zone)
+        expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+    raw_key = generate_api_key()
+    identity = ApiKeyIdentity(key_id=secrets.token_hex(8), tenant=tenant, scopes=frozenset(scopes))
+    await index.store.add(identity, hash_key(raw_key), expires_at)
+    index.invalidate()
+    return raw_key, identity
+
+
+async def revoke_api_key(key_id: str, index: ApiKeyIndex = api_key_index):
+    if index.store is None:
+        raise ValueError("API_KEYS_BACKEND is 'none'; there is no key store to revoke keys in.")
+    await index.store.revoke(key_id)
+    index.forget(key_id)
+    index.invalidate()
+
+
+def require_scopes(*scopes: str):
+    """
+    Dependency rejecting requests whose key lacks any of `scopes` (403):
+
+        @router.get("/reports", dependencies=[Depends(require_scopes("reports:read"))])
+    """
+
+    async def dependency(request: Request) -> Optional[ApiKeyIdentity]:
+        identity = getattr(request.state, "api_key", None)
+        if identity is None:
+            # Development mode skips authentication, so there is nothing to check
+            if ENVIRONMENT == 'dev':
+                return None
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        if not identity.has_scopes(*scopes):
+            raise HTTPException(status_code=403, detail="API key lacks required scope")
+        return identity
+
+    return dependency
@@ -0,0 +1,341 @@
+"""
+Load benchmark for the middleware stack: RPS and p50/p95/p99 latency per
+middleware configuration, driven fully in-process.
+
+Each configuration is a FastAPI app with the same test route and the
+middleware of main.py added in the same order, cumulatively:
+
+    bare              no middleware
+    cors              CORSMiddleware
+    compression       + CompressionMiddleware (the client accepts gzip)
+    auth              + APIKeyMiddleware (production path, passphrase key)
+    metrics           + MonitoringMiddleware, in-memory /metrics only
+    mongo             + request records written through MongoHandler
+    mysql             + request records written through MySQLHandler
+
+The Mongo and MySQL handlers run their real batch write code against
+in-memory stand-ins for the motor collection and the aiomysql pool
+(--db-latency-ms simulates the round trip), so no database is needed.
+ProfilingMiddleware is left out: it is off by default, and when on it
+only costs a random() call on requests it does not pick.
+
+Drivers:
+    asgi      httpx.AsyncClient over ASGITransport (default, no sockets).
+              Client and app share one event loop, so this measures the
+              CPU cost per request rather than behaviour under contention.
+    uvicorn   a local uvicorn server on a free port (needs uvicorn)
+
+Results are printed and saved as JSON (default benchmarks/results/) so runs
+can be compared across commits with --compare.
+
+Run from the project root:
+    python -m benchmarks.load [--requests 5000] [--concurrency 32] [--driver asgi]
+    python -m benchmarks.load --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import time
+from datetime import datetime
+
+os.environ.setdefault("API_KEY_HEADER_NAME", "X-API-Key")
+os.environ.setdefault("API_KEY_PASSPHRASE", "benchmark-key")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+import middleware
+from compression import CompressionMiddleware
+from middleware import APIKeyMiddleware
+from monitoring import BatchWriter, MongoHandler, MonitoringMiddleware, MySQLHandler
+from utils.config_loader import API_KEY_HEADER_NAME, API_KEY_PASSPHRASE
+from utils.responses import FastJSONResponse
+
+
+CONFIGURATIONS = ("bare", "cors", "compression", "auth", "metrics", "mongo", "mysql")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class InMemoryCollection:
+    """Stands in for a motor collection: keeps a count of inserted documents."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.documents = 0
+
+    async def insert_one(self, document):
+        await asyncio.sleep(self.latency)
+        self.documents += 1
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.latency)
+        self.documents += len(documents)
+
+
+class InMemoryMongoHandler(MongoHandler):
+    def __init__(self, latency: float):
+        super().__init__("", db_name="benchmark", collection_name="requests")
+        self.latency = latency
+
+    async def initialize(self):
+        self.collection = InMemoryCollection(self.latency)
+        self.is_initialized = True
+
+
+class _InMemoryCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=None):
+        await asyncio.sleep(self.pool.latency)
+        self.pool.rows += 1
+
+    async def executemany(self, query, args):
+        await asyncio.sleep(self.pool.latency)
+        self.pool.rows += len(args)
+
+
+class _InMemoryConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        await self.pool.semaphore.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool.semaphore.release()
+        return False
+
+    def cursor(self):
+        return _InMemoryCursor(self.pool)
+
+
+class InMemoryPool:
+    """Stands in for an aiomysql pool of `size` connections."""
+
+    def __init__(self, latency: float, size: int = 10):
+        self.latency = latency
+        self.semaphore = asyncio.Semaphore(size)
+        self.rows = 0
+
+    def acquire(self):
+        return _InMemoryConnection(self)
+
+
+class InMemoryMySQLHandler(MySQLHandler):
+    def __init__(self, latency: float):
+        super().__init__(host="", user="", password="", db="benchmark", table_name="requests")
+        self.latency = latency
+
+    async def initialize(self):
+        self.pool = InMemoryPool(self.latency)
+        self.is_initialized = True
+
+
+PAYLOAD = [
+    {"id": i, "name": f"Item {i}", "price": i * 1.5, "tags": ["a", "b"], "active": i % 2 == 0}
+    for i in range(20)
+]
+
+
+def build_app(configuration: str, db_latency: float):
+    """Returns (app, writer or None)."""
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/items")
+    async def items():
+        return PAYLOAD
+
+    level = CONFIGURATIONS.index(configuration)
+    writer = None
+    # add_middleware wraps the app, so add in the same order as main.py
+    if level >= CONFIGURATIONS.index("cors"):
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["https://your-frontend-domain.com"],
+            allow_credentials=True,
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            allow_headers=["Content-Type", "Authorization", API_KEY_HEADER_NAME],
+        )
+    if level >= CONFIGURATIONS.index("compression"):
+        app.add_middleware(CompressionMiddleware)
+    if level >= CONFIGURATIONS.index("auth"):
+        app.add_middleware(APIKeyMiddleware)
+    if level >= CONFIGURATIONS.index("metrics"):
+        handler = None
+        if configuration == "mongo":
+            handler = InMemoryMongoHandler(db_latency)
+        elif configuration == "mysql":
+            handler = InMemoryMySQLHandler(db_latency)
+        if handler is not None:
+            writer = BatchWriter(handler, max_queue_size=10000, batch_size=500, flush_interval=1.0)
+        app.add_middleware(MonitoringMiddleware, db_handler=handler, writer=writer)
+    return app, writer
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def load(client: httpx.AsyncClient, requests: int, concurrency: int):
+    headers = {API_KEY_HEADER_NAME: API_KEY_PASSPHRASE, "Origin": "https://your-frontend-domain.com"}
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.get("/items", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_configuration(configuration: str, args) -> dict:
+    app, writer = build_app(configuration, args.db_latency_ms / 1000)
+    server = server_task = None
+
+    if args.driver == "uvicorn":
+        import uvicorn
+
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+        )
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+    try:
+        async with client:
+            await load(client, args.warmup, args.concurrency)
+            elapsed, latencies, errors = await load(client, args.requests, args.concurrency)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+    if writer is not None:
+        await writer.stop()  # flush what is still buffered
+        result["writer"] = dict(writer.stats)
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def print_results(results: dict, previous: dict = None):
+    print(f"{'config':<12} {'rps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  {'vs previous':>12}")
+    for name, result in results.items():
+        delta = ""
+        if previous and name in previous:
+            before = previous[name]["rps"]
+            delta = f"{(result['rps'] - before) / before * 100:+.1f}% rps" if before else ""
+        print(
+            f"{name:<12} {result['rps']:>10} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+            f"{result['p99_ms']:>9} {result['errors']:>7}  {delta:>12}"
+        )
+        if "writer" in result:
+            stats = result["writer"]
+            print(f"{'':<10} writer: {stats['written']} written in {stats['batches']} batches, "
+                  f"{stats['dropped_oldest'] + stats['dropped_newest']} dropped")
+
+
+async def main(args):
+    # Benchmark the production code path, not the dev bypass
+    middleware.ENVIRONMENT = "prod"
+
+    configurations = args.configs.split(",") if args.configs else CONFIGURATIONS
+    results = {}
+    for configuration in configurations:
+        if configuration not in CONFIGURATIONS:
+            raise SystemExit(f"Unknown configuration {configuration!r}; choose from {', '.join(CONFIGURATIONS)}")
+        results[configuration] = await run_configuration(configuration, args)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)["results"]
+    print_results(results, previous)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "driver": args.driver,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "db_latency_ms": args.db_latency_ms,
+        },
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"load-{datetime.utcnow():%Y%m%d-%H%M%S}-{commit}.json")
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nSaved to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="measured requests per configuration")
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--driver", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--configs", default=None, help=f"comma-separated subset of {','.join(CONFIGURATIONS)}")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="simulated database round trip")
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare RPS against")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,124 @@
+"""
+Serialization and compression benchmark over representative payload sizes.
+
+For each payload (a list of API-style records with nested dicts, datetimes
+and ObjectId-like ids) it reports:
+  - render time with Starlette's JSONResponse (stdlib json, after FastAPI's
+    jsonable_encoder pass) and with FastJSONResponse (orjson, no encoder pass)
+  - compressed size and compression time for every available encoding
+
+Run from the project root:
+    python -m benchmarks.responses [--sizes 1,100,1000,10000] [--json]
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("API_KEY_HEADER_NAME", "X-API-Key")
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from compression import _encoders
+from utils.responses import FastJSONResponse
+
+
+class FakeObjectId:
+    """Stands in for bson.ObjectId without importing the driver."""
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"{self.value:024x}"
+
+
+FakeObjectId.__name__ = "ObjectId"
+
+
+def make_records(count: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "_id": FakeObjectId(i),
+            "created_at": start + timedelta(seconds=i),
+            "name": f"Item {i}",
+            "description": "A representative text field with a few words in it. " * 3,
+            "price": round(i * 1.37, 2),
+            "tags": ["alpha", "beta", "gamma"][: i % 3 + 1],
+            "owner": {"id": i % 97, "email": f"user{i % 97}@example.com", "active": i % 2 == 0},
+            "metrics": {"views": i * 13, "clicks": i * 3, "ratio": (i * 3) / (i * 13 + 1)},
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-3 mean time per call in milliseconds."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def stdlib_encoder(obj):
+    # jsonable_encoder cannot handle the fake ObjectId; the real app registers str for it
+    return jsonable_encoder(obj, custom_encoder={FakeObjectId: str})
+
+
+def run(sizes):
+    encoders = _encoders(gzip_level=6, brotli_quality=4, zstd_level=3)
+    results = []
+    for size in sizes:
+        records = make_records(size)
+        repeat = max(3, 2000 // size)
+        body = FastJSONResponse(records).body
+
+        result = {
+            "records": size,
+            "json_bytes": len(body),
+            "stdlib_render_ms": round(timed(lambda: JSONResponse(stdlib_encoder(records)), repeat), 3),
+            "fast_render_ms": round(timed(lambda: FastJSONResponse(records), repeat), 3),
+            "compression": {},
+        }
+        for name, encode in encoders.items():
+            compressed = encode(body)
+            result["compression"][name] = {
+                "bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "ms": round(timed(lambda: encode(body), repeat), 3),
+            }
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,100,1000,10000", help="comma-separated record counts")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",")])
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'records':>8} {'bytes':>10} {'stdlib ms':>10} {'orjson ms':>10}  compression (bytes, ratio, ms)")
+    for result in results:
+        compression = "  ".join(
+            f"{name}: {stats['bytes']} x{stats['ratio']} {stats['ms']}ms"
+            for name, stats in result["compression"].items()
+        )
+        print(
+            f"{result['records']:>8} {result['json_bytes']:>10} {result['stdlib_render_ms']:>10} "
+            f"{result['fast_render_ms']:>10}  {compression}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Startup benchmark: import time of main.py and time to the first response.
+
+Each run starts a fresh interpreter, imports main, runs the lifespan startup
+and sends one GET /health-check through the ASGI app in-process. The median
+over all runs is reported; use --max-import-ms / --max-first-request-ms to
+fail (exit code 1) when a change makes cold starts slower.
+
+Run from the project root:
+    python -m benchmarks.startup [--runs 5] [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+PROBE = r"""
+import time
+_start = time.perf_counter()
+import asyncio, json, sys
+
+import main
+_imported = time.perf_counter()
+
+
+async def first_request():
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/health-check",
+        "raw_path": b"/health-check", "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+    }
+    async with main.app.router.lifespan_context(main.app):
+        started = time.perf_counter()
+        await main.app(scope, receive, send)
+        responded = time.perf_counter()
+    return started, responded, messages[0]["status"]
+
+
+started, responded, status = asyncio.run(first_request())
+heavy = [name for name in ("motor", "pymongo", "sqlalchemy", "aiomysql") if name in sys.modules]
+print(json.dumps({
+    "import_ms": (_imported - _start) * 1000,
+    "startup_ms": (started - _imported) * 1000,
+    "first_request_ms": (responded - _start) * 1000,
+    "status": status,
+    "loaded_drivers": heavy,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise SystemExit(f"Startup probe failed:\n{result.stderr}")
+    # The lifespan prints its own messages; the JSON line is the last one
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_importtime(env: dict, top: int = 15):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], capture_output=True, text=True, env=env
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            rows.append((int(parts[1]), parts[2].rstrip()))
+        except ValueError:
+            continue
+    print(f"\nSlowest imports (cumulative us):")
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative:>10}  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="also show the slowest imports")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-request-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("API_KEY_HEADER_NAME", "X-API-Key")
+    env.setdefault("ENVIRONMENT", "dev")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    results = [run_once(env) for _ in range(args.runs)]
+    summary = {
+        key: round(statistics.median(result[key] for result in results), 1)
+        for key in ("import_ms", "startup_ms", "first_request_ms")
+    }
+    summary["loaded_drivers"] = results[-1]["loaded_drivers"]
+    summary["status"] = results[-1]["status"]
+    print(json.dumps(summary, indent=2))
+
+    if args.importtime:
+        print_importtime(env)
+
+    failed = False
+    if args.max_import_ms is not None and summary["import_ms"] > args.max_import_ms:
+        print(f"Import time {summary['import_ms']} ms exceeds {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_request_ms is not None and summary["first_request_ms"] > args.max_first_request_ms:
+        print(f"Time to first request {summary['first_request_ms']} ms exceeds {args.max_first_request_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
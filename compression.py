@@ -0,0 +1,189 @@
+import asyncio
+import gzip
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.config_loader import COMPRESSION_MINIMUM_SIZE, COMPRESSION_THREAD_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Never compressed: already compressed formats, and streams where buffering
+# would delay events (SSE, NDJSON)
+SKIP_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/x-ndjson",
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/octet-stream",
+    "application/pdf",
+)
+
+
+def _encoders(gzip_level: int, brotli_quality: int, zstd_level: int) -> Dict[str, Callable[[bytes], bytes]]:
+    encoders = {"gzip": lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=zstd_level)
+        encoders["zstd"] = compressor.compress
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """{"gzip": 1.0, "br": 0.5, ...} from an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Raw ASGI middleware compressing responses with zstd, brotli or gzip,
+    whichever the client accepts and is installed, in that order of
+    preference (ties broken by the client's q-values).
+
+    Only complete bodies of at least `minimum_size` bytes are compressed.
+    Streaming responses (more than one body message), responses that already
+    have a Content-Encoding and SKIP_CONTENT_TYPES pass through unchanged.
+    brotli and zstandard are optional packages; without them only gzip is
+    offered.
+
+    Bodies of `thread_min_size` bytes or more are compressed in a worker
+    thread (the codecs release the GIL), so the event loop keeps serving
+    other requests meanwhile. A strong ETag becomes weak on compressed
+    responses: the encoded variants are not byte-identical.
+    """
+
+    PREFERENCE = ("zstd", "br", "gzip")
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        skip_content_types: Sequence[str] = SKIP_CONTENT_TYPES,
+        thread_min_size: int = COMPRESSION_THREAD_MIN_SIZE
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_min_size = thread_min_size
+        self.encoders = _encoders(gzip_level, brotli_quality, zstd_level)
+        self.skip_content_types = tuple(skip_content_types)
+        self._choices: Dict[bytes, Optional[str]] = {}
+
+    def choose_encoding(self, accept_encoding: bytes) -> Optional[str]:
+        # Browsers send a handful of distinct headers, so the parse is cached
+        choice = self._choices.get(accept_encoding, "")
+        if choice != "":
+            return choice
+        accepted = parse_accept_encoding(accept_encoding.decode("latin-1"))
+        wildcard = accepted.get("*", 0.0)
+        candidates = [
+            (accepted.get(name, wildcard), -rank, name)
+            for rank, name in enumerate(self.PREFERENCE)
+            if name in self.encoders
+        ]
+        best = max(candidates)
+        choice = best[2] if best[0] > 0 else None
+        if len(self._choices) < 256:
+            self._choices[accept_encoding] = choice
+        return choice
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value
+                break
+        encoding = self.choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or content_type.startswith(self.skip_content_types)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until we know whether the body is worth compressing
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            passthrough = True
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Streaming or small: send as-is
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= self.thread_min_size:
+                compressed = await asyncio.to_thread(self.encoders[encoding], body)
+            else:
+                compressed = self.encoders[encoding](body)
+            headers = MutableHeaders(raw=list(start_message.get("headers", [])))
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            start_message["headers"] = headers.raw
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,11 +1,29 @@
-from pymongo.errors import ConnectionFailure
-from motor.motor_asyncio import AsyncIOMotorClient
 import asyncio
-from utils.config_loader import MONGO_CONNECTION_STRING
+from typing import TYPE_CHECKING
+from utils.config_loader import (
+    MONGO_CONNECTION_STRING,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_HEARTBEAT_INTERVAL_SECONDS,
+)
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 
 
 class AsyncMongoDB:
+    """
+    Process-wide MongoDB client.
+
+    Connection health is tracked by a background heartbeat task instead of
+    pinging the server on every access, so get_database() and
+    get_collection() return cached handles without any I/O once connected.
+    The lock is only taken when a (re)connect is actually needed.
+    """
+
     _instance = None
     _lock = asyncio.Lock()  # To prevent simultaneous reconnections
 
@@ -13,22 +31,48 @@ class AsyncMongoDB:
         if not cls._instance:
             cls._instance = super(AsyncMongoDB, cls).__new__(cls, *args, **kwargs)
             cls._instance.client = None
+            cls._instance.healthy = False
+            cls._instance._databases = {}
+            cls._instance._collections = {}
+            cls._instance._heartbeat_task = None
         return cls._instance
 
     async def is_connected(self):
         """Check if we have an active MongoDB connection."""
+        from pymongo.errors import ConnectionFailure
+
         if self.client:
             try:
                 await self.client.admin.command("ismaster")
                 return True
             except ConnectionFailure as ex:
                 pass
-                
+
         return False
-    
+
+    def _create_client(self, connection_string: str) -> "AsyncIOMotorClient":
+        # Imported here so the driver is only loaded when Mongo is enabled
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from utils.responses import register_bson_encoders
+
+        register_bson_encoders()
+
+        options = {
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        }
+        if MONGO_MAX_IDLE_TIME_MS:
+            options["maxIdleTimeMS"] = MONGO_MAX_IDLE_TIME_MS
+        return AsyncIOMotorClient(connection_string, **options)
+
     async def connect(self, retries=5, delay=1):
+        if self.client is not None and self.healthy:
+            return
+
         async with self._lock:
-            if await self.is_connected():
+            # Another task may have reconnected while we waited for the lock
+            if self.client is not None and self.healthy:
                 return
 
             for attempt in range(1, retries + 1):
@@ -36,25 +80,67 @@ class AsyncMongoDB:
                     connection_string = MONGO_CONNECTION_STRING
                     if not connection_string:
                         raise ValueError("MongoDB connection string not set in environment variables.")
-                    self.client = AsyncIOMotorClient(connection_string)
-                    if await self.is_connected():
-                        return
+                    if self.client is None:
+                        self.client = self._create_client(connection_string)
+                        self._databases.clear()
+                        self._collections.clear()
+                    if not await self.is_connected():
+                        raise ConnectionError("MongoDB did not answer the ping.")
+                    self.healthy = True
+                    self._start_heartbeat()
+                    return
                 except Exception as ex:
-                    
+
                     if attempt < retries:
                         await asyncio.sleep(delay)
                         delay *= 2
                     else:
-                        raise ex  
+                        raise ex
+
+    def _start_heartbeat(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        """Ping the server periodically and record whether it answered."""
+        while self.client is not None:
+            await asyncio.sleep(MONGO_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                self.healthy = await self.is_connected()
+            except Exception:
+                self.healthy = False
 
     async def get_database(self, db_name):
+        database = self._databases.get(db_name)
+        if database is not None and self.healthy:
+            return database
+
         await self.connect()  # Ensure connection is established
-        return self.client[db_name]
+        database = self._databases.get(db_name)
+        if database is None:
+            database = self._databases[db_name] = self.client[db_name]
+        return database
+
+    async def get_collection(self, db_name, collection_name):
+        key = (db_name, collection_name)
+        collection = self._collections.get(key)
+        if collection is not None and self.healthy:
+            return collection
+
+        database = await self.get_database(db_name)
+        collection = self._collections[key] = database[collection_name]
+        return collection
 
     async def close(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
         if self.client:
             self.client.close()
             self.client = None
+        self.healthy = False
+        self._databases.clear()
+        self._collections.clear()
 
 mongo_db_instance = AsyncMongoDB()
 
@@ -65,10 +151,15 @@ async def get_database(db_name):
         raise
 
 
-async def establish_connection():
+async def get_collection(db_name, collection_name):
     try:
-        await mongo_db_instance.connect()
+        return await mongo_db_instance.get_collection(db_name, collection_name)
     except Exception as ex:
         raise
 
 
+async def establish_connection():
+    try:
+        await mongo_db_instance.connect()
+    except Exception as ex:
+        raise
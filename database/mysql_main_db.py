@@ -1,32 +1,173 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+import itertools
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-from utils.config_loader import MYSQL_CONNECTION_STRING
-
-# Enhanced engine configuration
-engine = create_async_engine(
+from typing import AsyncGenerator, Dict, Any, List, Optional
+from utils.config_loader import (
     MYSQL_CONNECTION_STRING,
-    echo=False,  # Set to False in production for better performance
-    pool_size=40,  # Reduced from 20 to prevent excess connections
-    max_overflow=20,  # Reduced from 10 to prevent resource exhaustion
-    pool_timeout=30,  # Reduced timeout for faster error detection
-    pool_recycle=3600,  # Increased to reduce connection cycling overhead
-    pool_pre_ping=True,  # Enable connection health checks
-    
+    MYSQL_REPLICA_CONNECTION_STRINGS,
+    MYSQL_REPLICA_ROUTING,
+    MYSQL_POOL_SIZE,
+    MYSQL_MAX_OVERFLOW,
+    MYSQL_POOL_TIMEOUT,
+    MYSQL_POOL_RECYCLE,
+    MYSQL_POOL_PRE_PING,
+    MYSQL_REPLICA_POOL_SIZE,
+    MYSQL_REPLICA_MAX_OVERFLOW,
+    MYSQL_REPLICA_POOL_TIMEOUT,
+    MYSQL_REPLICA_POOL_RECYCLE,
+    MYSQL_REPLICA_POOL_PRE_PING,
 )
+from database.query_instrumentation import instrument_engine
+from metrics import GaugeFamily, metrics_registry
 
-# Async sessionmaker
-# Optimized session configuration
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False  # Prevent automatic flushing for better control
-)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection,
+    including the time to open a new one when the pool grows.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time_total += waited
+            if waited > self.wait_time_max:
+                self.wait_time_max = waited
+
+
+def _build_engine(connection_string: str, pool_size: int, max_overflow: int, pool_timeout: float,
+                  pool_recycle: int, pool_pre_ping: bool) -> AsyncEngine:
+    engine = create_async_engine(
+        connection_string,
+        echo=False,  # Set to False in production for better performance
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+    )
+    # Time every statement: slow query log, per-request query counts, N+1 detection
+    return instrument_engine(engine)
+
+
+def _session_factory(bind: AsyncEngine) -> sessionmaker:
+    # Optimized session configuration
+    return sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False  # Prevent automatic flushing for better control
+    )
+
+
+class ReplicaRouter:
+    """
+    Picks the replica for a read-only session.
+
+    "round_robin" cycles through the replicas; "least_in_use" picks the one
+    with the fewest checked-out connections.
+    """
+
+    POLICIES = ("round_robin", "least_in_use")
+
+    def __init__(self, engines: List[AsyncEngine], policy: str = "round_robin"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"MYSQL_REPLICA_ROUTING must be one of {self.POLICIES}, got {policy!r}")
+        self.engines = engines
+        self.policy = policy
+        self._cycle = itertools.cycle(range(len(engines))) if engines else None
+
+    def choose(self) -> int:
+        if self.policy == "least_in_use":
+            return min(range(len(self.engines)), key=lambda i: self.engines[i].pool.checkedout())
+        return next(self._cycle)
+
+
+_engine: Optional[AsyncEngine] = None
+_replica_engines: List[AsyncEngine] = []
+_session_factories: Dict[str, Any] = {}
+_replica_router: Optional[ReplicaRouter] = None
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Return the primary engine, creating it and any replica engines on first
+    use. Nothing is built at import time, so importing this module works
+    without MYSQL_CONNECTION_STRING when MySQL is not used.
+    """
+    global _engine, _replica_router
+    if _engine is not None:
+        return _engine
+    if not MYSQL_CONNECTION_STRING:
+        raise ValueError("MySQL connection string not set in environment variables.")
+
+    # Enhanced engine configuration
+    engine = _build_engine(
+        MYSQL_CONNECTION_STRING,
+        pool_size=MYSQL_POOL_SIZE,
+        max_overflow=MYSQL_MAX_OVERFLOW,
+        pool_timeout=MYSQL_POOL_TIMEOUT,
+        pool_recycle=MYSQL_POOL_RECYCLE,
+        pool_pre_ping=MYSQL_POOL_PRE_PING,
+    )
+
+    # Optional read replicas; read-only sessions fall back to the primary without them
+    _replica_engines[:] = [
+        _build_engine(
+            url,
+            pool_size=MYSQL_REPLICA_POOL_SIZE,
+            max_overflow=MYSQL_REPLICA_MAX_OVERFLOW,
+            pool_timeout=MYSQL_REPLICA_POOL_TIMEOUT,
+            pool_recycle=MYSQL_REPLICA_POOL_RECYCLE,
+            pool_pre_ping=MYSQL_REPLICA_POOL_PRE_PING,
+        )
+        for url in MYSQL_REPLICA_CONNECTION_STRINGS
+    ]
+
+    # Async sessionmaker
+    _session_factories["primary"] = _session_factory(engine)
+    _session_factories["replicas"] = [_session_factory(replica) for replica in _replica_engines]
+    _replica_router = ReplicaRouter(_replica_engines, MYSQL_REPLICA_ROUTING)
+
+    if _pool_metrics not in metrics_registry.collectors:
+        metrics_registry.register_collector(_pool_metrics)
+    _engine = engine
+    return _engine
+
+
+def get_replica_engines() -> List[AsyncEngine]:
+    get_engine()
+    return _replica_engines
+
+
+def __getattr__(name: str):
+    # Keeps `from database.mysql_main_db import engine` working without
+    # building the engine at import time
+    if name == "engine":
+        return get_engine()
+    if name == "replica_engines":
+        return get_replica_engines()
+    if name == "AsyncSessionLocal":
+        get_engine()
+        return _session_factories["primary"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Define the declarative base
@@ -34,12 +175,19 @@ Base = declarative_base()
 
 
 @asynccontextmanager
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_session(read_only: bool = False) -> AsyncGenerator[AsyncSession, None]:
     """
     Create and manage database session with proper error handling and cleanup.
     Uses async context manager for better resource management.
+
+    With read_only=True the session is bound to a read replica chosen by
+    MYSQL_REPLICA_ROUTING, or to the primary when no replica is configured.
     """
-    session = AsyncSessionLocal()
+    get_engine()
+    if read_only and _session_factories["replicas"]:
+        session = _session_factories["replicas"][_replica_router.choose()]()
+    else:
+        session = _session_factories["primary"]()
     try:
         yield session
     except Exception:
@@ -48,14 +196,75 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     finally:
         await session.close()
 
+
+def _pool_stats(pool: TimedQueuePool) -> Dict[str, Any]:
+    size = pool.size()
+    checked_out = pool.checkedout()
+    capacity = size + max(pool._max_overflow, 0)
+    checkouts = pool.checkouts
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+        "checkouts": checkouts,
+        "avg_wait_ms": round(pool.wait_time_total / checkouts * 1000, 3) if checkouts else 0.0,
+        "max_wait_ms": round(pool.wait_time_max * 1000, 3),
+    }
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Connection pool utilization per engine, for sizing pools from real traffic."""
+    if _engine is None:
+        return {}
+    stats = {"primary": _pool_stats(_engine.pool)}
+    for index, replica in enumerate(_replica_engines):
+        stats[f"replica_{index}"] = _pool_stats(replica.pool)
+    return stats
+
+
+def _pool_metrics() -> List[str]:
+    gauges = {
+        key: GaugeFamily(f"db_pool_{key}", description, ("engine",))
+        for key, description in (
+            ("checked_out", "Connections currently checked out of the pool"),
+            ("overflow", "Connections open beyond pool_size"),
+            ("utilization", "Checked-out connections / (pool_size + max_overflow)"),
+            ("avg_wait_ms", "Average time a checkout waited for a connection"),
+            ("max_wait_ms", "Longest time a checkout waited for a connection"),
+        )
+    }
+    for name, stats in get_pool_stats().items():
+        for key, gauge in gauges.items():
+            gauge.set((name,), stats[key])
+    lines = []
+    for gauge in gauges.values():
+        lines.extend(gauge.render())
+    return lines
+
+
+
+async def close_db() -> None:
+    """Dispose the engines created by get_engine(), if any."""
+    global _engine
+    if _engine is None:
+        return
+    for replica in _replica_engines:
+        await replica.dispose()
+    await _engine.dispose()
+    _engine = None
+
+
 async def init_db() -> None:
     """
     Initialize database connection and perform startup checks.
     """
     try:
-        async with engine.begin() as conn:
+        async with get_engine().begin() as conn:
             # Optional: Create tables
             await conn.run_sync(Base.metadata.create_all)
     except Exception as e:
         print(f"Database initialization failed: {e}")
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,329 @@
+"""
+Keyset pagination and constant-memory exports for MongoDB and MySQL.
+
+Pages continue from the sort key of the last row returned instead of
+skipping rows, so page 1000 costs the same as page 1 when an index covers
+the sort. The position travels as an opaque, signed cursor token:
+
+    page = await mongo_keyset_page(collection, {"tenant": t}, sort=[("created_at", -1)], cursor=token)
+    return page.to_dict()   # {"items": [...], "next_cursor": "...", "has_more": true}
+
+    page = await sql_keyset_page(session, select(ApiKey), order_by=[(ApiKey.tenant, 1)], cursor=token)
+
+Exports stream rows from a motor cursor or SQLAlchemy stream() in batches
+and encode them as they go, so memory stays flat whatever the row count:
+
+    return ndjson_response(stream_mongo("db", "requests", {"tenant": t}))
+    return json_array_response(stream_sql(select(ApiKey)), transform=lambda key: {"id": key.key_id})
+"""
+import base64
+import hashlib
+import hmac
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from utils.responses import dumps
+from utils.config_loader import (
+    PAGINATION_DEFAULT_LIMIT,
+    PAGINATION_MAX_LIMIT,
+    PAGINATION_CURSOR_SECRET,
+    STREAM_BATCH_SIZE,
+)
+
+
+# Streamed responses are sent in chunks of about this size rather than one
+# message per row
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class InvalidCursor(ValueError):
+    """The cursor token was tampered with, truncated or made for another ordering."""
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Page size from a query parameter: PAGINATION_DEFAULT_LIMIT when missing, capped at PAGINATION_MAX_LIMIT."""
+    if not limit or limit < 1:
+        return PAGINATION_DEFAULT_LIMIT
+    return min(limit, PAGINATION_MAX_LIMIT)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if type(value).__name__ == "ObjectId":
+        return {"$oid": str(value)}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"Cannot put a {type(value).__name__} sort key in a cursor")
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+        if "$oid" in value:
+            from bson import ObjectId
+
+            return ObjectId(value["$oid"])
+        raise InvalidCursor("Unexpected value in cursor")
+    return value
+
+
+def _signature(payload: bytes, secret: str) -> bytes:
+    return hmac.new(secret.encode("utf-8"), payload, hashlib.sha256).digest()[:12]
+
+
+def encode_cursor(values: Sequence[Any], ordering: str, secret: str = PAGINATION_CURSOR_SECRET) -> str:
+    """Token for "continue after the row whose sort key is `values`" under `ordering`."""
+    payload = json.dumps([ordering, [_encode_value(value) for value in values]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(_signature(payload, secret) + payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, ordering: str, secret: str = PAGINATION_CURSOR_SECRET) -> List[Any]:
+    """Sort key values from a token made by encode_cursor for the same ordering; raises InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        signature, payload = raw[:12], raw[12:]
+        if not hmac.compare_digest(signature, _signature(payload, secret)):
+            raise InvalidCursor("Cursor signature does not match")
+        token_ordering, values = json.loads(payload)
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if token_ordering != ordering:
+        raise InvalidCursor("Cursor was made for a different ordering")
+    return [_decode_value(value) for value in values]
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"items": self.items, "next_cursor": self.next_cursor, "has_more": self.has_more}
+
+
+#### MongoDB
+
+
+def _with_tiebreaker(sort: Sequence[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    # The key must be unique for keyset pagination to neither skip nor repeat rows
+    sort = list(sort)
+    if not any(field == "_id" for field, _ in sort):
+        sort.append(("_id", sort[-1][1] if sort else 1))
+    return sort
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        document = document.get(part) if isinstance(document, dict) else None
+    return document
+
+
+def _mongo_field_after(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    # Null and missing sort before every value, and $gt/$lt never match them,
+    # so they need their own conditions (None: nothing comes after)
+    if direction >= 0:
+        return {field: {"$ne": None}} if value is None else {field: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def _mongo_after(sort: Sequence[Tuple[str, int]], values: Sequence[Any]) -> Dict[str, Any]:
+    """Filter for rows after `values`: (a > x) or (a == x and b > y) ..., per field direction."""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        after = _mongo_field_after(field, direction, values[i])
+        if after is None:
+            continue
+        # {field: None} matches null and missing alike
+        equal = [{earlier: values[j]} for j, (earlier, _) in enumerate(sort[:i])]
+        clauses.append({"$and": equal + [after]} if equal else after)
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+async def mongo_keyset_page(
+    collection,
+    filter: Optional[Dict[str, Any]] = None,
+    sort: Sequence[Tuple[str, int]] = (),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Page:
+    """
+    One page of `collection` in `sort` order ("_id" is added as the final
+    tiebreaker). Back it with an index on the filter and sort fields. Null
+    or missing sort fields are fine: they sort before every value.
+    """
+    sort = _with_tiebreaker(sort)
+    ordering = "mongo:" + ",".join(f"{field}:{direction}" for field, direction in sort)
+    limit = clamp_limit(limit)
+    query = dict(filter or {})
+    if cursor:
+        after = _mongo_after(sort, decode_cursor(cursor, ordering))
+        query = {"$and": [query, after]} if query else after
+    if projection and any(value for field, value in projection.items() if field != "_id"):
+        # Inclusion projection: the sort fields are needed to build the next cursor
+        projection = dict(projection, **{field: 1 for field, _ in sort})
+
+    documents = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor([_get_path(last, field) for field, _ in sort], ordering)
+    return Page(documents, next_cursor)
+
+
+async def stream_mongo(
+    db_name: str,
+    collection_name: str,
+    filter: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    sort: Optional[Sequence[Tuple[str, int]]] = None,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """Documents one at a time, fetched from the server `batch_size` at a time."""
+    from database.mongo import get_collection
+
+    collection = await get_collection(db_name, collection_name)
+    cursor = collection.find(filter or {}, projection, batch_size=batch_size)
+    if sort:
+        cursor = cursor.sort(list(sort))
+    try:
+        async for document in cursor:
+            yield document
+    finally:
+        # Frees the server-side cursor when the client disconnects mid-export
+        await cursor.close()
+
+
+#### MySQL (SQLAlchemy)
+
+
+def _row_value(row: Any, column) -> Any:
+    if hasattr(row, "_mapping"):
+        return row._mapping[column]
+    return getattr(row, column.key)
+
+
+def _sql_after(order_by: Sequence[Tuple[Any, int]], values: Sequence[Any]):
+    from sqlalchemy import and_, false, or_
+
+    clauses = []
+    for i, (column, direction) in enumerate(order_by):
+        value = values[i]
+        # MySQL sorts NULL before every value and comparisons with NULL are never true
+        if direction >= 0:
+            after = column.is_not(None) if value is None else column > value
+        elif value is None:
+            continue
+        else:
+            after = or_(column < value, column.is_(None))
+        # `column == None` compiles to IS NULL
+        equal = [earlier == values[j] for j, (earlier, _) in enumerate(order_by[:i])]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses) if clauses else false()
+
+
+async def sql_keyset_page(
+    session,
+    statement,
+    order_by: Sequence[Tuple[Any, int]],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    scalars: bool = True
+) -> Page:
+    """
+    One page of a select() in `order_by` order, given as (column, 1 | -1)
+    pairs whose last column is unique (usually the primary key). With
+    scalars=True (select(Model)) items are model instances, otherwise rows.
+    Nullable columns follow MySQL's ordering, NULL before every value.
+    """
+    ordering = "sql:" + ",".join(f"{column.key}:{direction}" for column, direction in order_by)
+    limit = clamp_limit(limit)
+    if cursor:
+        statement = statement.where(_sql_after(order_by, decode_cursor(cursor, ordering)))
+    statement = statement.order_by(
+        *(column.asc() if direction >= 0 else column.desc() for column, direction in order_by)
+    ).limit(limit + 1)
+
+    result = await session.execute(statement)
+    items = list(result.scalars() if scalars else result.all())
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([_row_value(items[-1], column) for column, _ in order_by], ordering)
+    return Page(items, next_cursor)
+
+
+async def stream_sql(
+    statement,
+    batch_size: int = STREAM_BATCH_SIZE,
+    scalars: bool = True,
+    read_only: bool = True
+) -> AsyncIterator[Any]:
+    """
+    Rows of a select() through a server-side cursor (session.stream), fetched
+    `batch_size` at a time. The session, on a replica when read_only, stays
+    open for the whole export and closes when the generator does.
+    """
+    from database.mysql_main_db import get_session
+
+    async with get_session(read_only=read_only) as session:
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        if scalars:
+            result = result.scalars()
+        async for partition in result.partitions(batch_size):
+            for row in partition:
+                yield row
+
+
+#### Streaming responses
+
+
+async def _encode(items: AsyncIterator[Any], transform: Optional[Callable[[Any], Any]],
+                  prefix: bytes, separator: bytes, terminator: bytes, suffix: bytes) -> AsyncIterator[bytes]:
+    buffer = bytearray(prefix)
+    first = True
+    async for item in items:
+        if not first:
+            buffer += separator
+        first = False
+        buffer += dumps(transform(item) if transform else item)
+        buffer += terminator
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += suffix
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_response(items: AsyncIterator[Any], transform: Optional[Callable[[Any], Any]] = None,
+                    filename: Optional[str] = None) -> StreamingResponse:
+    """One JSON document per line, encoded while the rows are still being fetched."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return StreamingResponse(
+        _encode(items, transform, b"", b"", b"\n", b""), media_type="application/x-ndjson", headers=headers
+    )
+
+
+def json_array_response(items: AsyncIterator[Any], transform: Optional[Callable[[Any], Any]] = None,
+                        filename: Optional[str] = None) -> StreamingResponse:
+    """A single JSON array for clients that cannot read NDJSON, still built incrementally."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return StreamingResponse(
+        _encode(items, transform, b"[", b",", b"", b"]"), media_type="application/json", headers=headers
+    )
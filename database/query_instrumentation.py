@@ -0,0 +1,103 @@
+import re
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from utils.config_loader import SLOW_QUERY_THRESHOLD_MS, N_PLUS_ONE_THRESHOLD
+from utils.logger_setup import get_logger
+
+
+@dataclass
+class QueryStats:
+    """Queries issued while handling one request."""
+    path: str = ""
+    count: int = 0
+    total_time_ms: float = 0.0
+    statements: Dict[str, int] = field(default_factory=dict)
+    n_plus_one: List[str] = field(default_factory=list)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape: literals become ?, IN lists collapse to
+    a single placeholder and whitespace is squeezed. Statements that differ
+    only in their values normalize to the same string.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("IN (?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def start_query_tracking(path: str = "") -> Tuple[QueryStats, Token]:
+    """Start counting queries for the current request (one per task/context)."""
+    stats = QueryStats(path=path)
+    return stats, _current_stats.set(stats)
+
+
+def stop_query_tracking(token: Token):
+    _current_stats.reset(token)
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+    stats = _current_stats.get()
+    normalized = None
+
+    if stats is not None:
+        normalized = normalize_sql(statement)
+        stats.count += 1
+        stats.total_time_ms += elapsed_ms
+        seen = stats.statements.get(normalized, 0) + 1
+        stats.statements[normalized] = seen
+        if seen == N_PLUS_ONE_THRESHOLD:
+            stats.n_plus_one.append(normalized)
+            get_logger().warning(
+                f"Possible N+1 query pattern on {stats.path}: statement ran {seen} times: {normalized}"
+            )
+
+    if elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+        normalized = normalized or normalize_sql(statement)
+        path = f" on {stats.path}" if stats is not None else ""
+        get_logger().warning(f"Slow query ({elapsed_ms:.1f} ms){path}: {normalized}")
+
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute will not pop its timer
+    start_times = exception_context.connection.info.get("query_start_times") if exception_context.connection else None
+    if start_times:
+        start_times.pop()
+
+
+def instrument_engine(engine):
+    """Attach timing hooks to an Engine or AsyncEngine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    return engine
@@ -0,0 +1,113 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from metrics import metrics_registry
+from utils.config_loader import LOOP_MONITOR_INTERVAL_MS, LOOP_LAG_THRESHOLD_MS
+from utils.logger_setup import get_logger
+
+
+# Finer buckets than request latency: lag is usually well under a millisecond
+LOOP_LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+event_loop_lag_seconds = metrics_registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke up a periodic timer", buckets=LOOP_LAG_BUCKETS
+)
+event_loop_lag_last_seconds = metrics_registry.gauge(
+    "event_loop_lag_last_seconds", "Most recent event loop lag measurement"
+)
+event_loop_blocked_total = metrics_registry.counter(
+    "event_loop_blocked_total", "Stalls longer than LOOP_LAG_THRESHOLD_MS caught by the watchdog"
+)
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag and catches the code that causes it.
+
+    A task sleeps for `interval` in a loop; how much later than asked it
+    wakes up is the lag, exported as event_loop_lag_seconds on /metrics.
+    Each tick also stamps a heartbeat. A watchdog thread checks the stamp,
+    and when the loop has not ticked for `threshold` it grabs the loop
+    thread's current stack with sys._current_frames() while the stall is
+    still happening, so the log shows the blocking call itself. One stack is
+    logged per stall.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL_MS / 1000,
+        threshold: float = LOOP_LAG_THRESHOLD_MS / 1000,
+        stack_limit: int = 40
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self._heartbeat = time.monotonic()
+            event_loop_lag_seconds.observe((), lag)
+            event_loop_lag_last_seconds.set((), lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.threshold:
+                get_logger().warning(f"Event loop lag {lag * 1000:.1f} ms (threshold {self.threshold * 1000:.0f} ms)")
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_limit))
+            self.stalls += 1
+            event_loop_blocked_total.inc(())
+            get_logger().warning(
+                f"Event loop blocked for {stalled_for * 1000:.0f} ms+; loop thread stack:\n{stack}"
+            )
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._watchdog.join)
+        self._watchdog = None
+
+
+loop_monitor = LoopLagMonitor()
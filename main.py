@@ -1,6 +1,8 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
+from utils.responses import FastJSONResponse
 from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
@@ -11,20 +13,50 @@ from starlette.requests import Request
 
 
 from middleware import APIKeyMiddleware
-
-
-from database.mongo import establish_connection, mongo_db_instance
-from database.mysql_main_db import init_db
-
-
-from monitoring import MongoHandler, MonitoringMiddleware
-from utils.logger_setup import initialize_logger, MongoLogConfig
-from utils.config_loader import ENVIRONMENT, MONGO_CONNECTION_STRING
+from compression import CompressionMiddleware
+from profiling import ProfilingMiddleware
+from loop_monitor import loop_monitor
+from metrics import metrics_registry, write_snapshot, write_snapshots_periodically
+from api_keys import api_key_index
+from services.jobs import job_engine
+from services.sample_jobs import register_sample_jobs
+
+
+# Database drivers (motor, SQLAlchemy, aiomysql) are imported inside the
+# lifespan and the handlers only when enabled, to keep cold starts fast.
+from monitoring import MonitoringMiddleware, BatchWriter, build_monitoring_handler, flush_monitoring
+from monitoring_rollups import rollup_scheduler
+from utils.logger_setup import initialize_logger, cleanup_logger, MongoLogConfig
+from services.apis.http_client import close_http_client
+from utils.config_loader import ENVIRONMENT
 from utils.config_loader import API_KEY_HEADER_NAME
+from utils.config_loader import (
+    MONGO_ENABLED,
+    MYSQL_ENABLED,
+    FILE_LOGGING_ENABLED,
+    MONGO_LOGGING_ENABLED,
+    MONGO_LOGGING_DB_NAME,
+    MONITORING_ENABLED,
+    MONITORING_BACKEND,
+    MONITORING_DB_NAME,
+    MONITORING_COLLECTION_NAME,
+    COMPRESSION_ENABLED,
+    PROFILING_ENABLED,
+    LOOP_MONITOR_ENABLED,
+    METRICS_MULTIPROC_DIR,
+    METRICS_SNAPSHOT_INTERVAL_SECONDS,
+    PAGINATION_CURSOR_SECRET,
+    API_KEY_PEPPER,
+)
 
 
 
 from routers import (
+    batch,
+    health,
+    jobs,
+    metrics,
+    monitoring,
     sample
 )
 
@@ -34,34 +66,110 @@ from routers import (
 async def lifespan(app: FastAPI):
     # Startup code (previously @app.on_event("startup"))
     print("Starting up...")
+    if not API_KEY_PEPPER:
+        print("Warning: API_KEY_PEPPER is empty; stored API key hashes are unkeyed")
+    if not PAGINATION_CURSOR_SECRET:
+        print("Warning: PAGINATION_CURSOR_SECRET and API_KEY_PEPPER are empty; pagination cursors can be forged")
     
 
     #### Establish Mongo DB Connection ####
 
-    #await establish_connection()
+    if MONGO_ENABLED:
+        from database.mongo import establish_connection
+        await establish_connection()
 
     #### Establish Mongo DB Connection ####
 
 
+    #### Initialize MySQL (creates the engine and any missing tables)
+
+    if MYSQL_ENABLED:
+        from database.mysql_main_db import init_db
+        await init_db()
+
+    #### Initialize MySQL
+
+
+    #### Load API keys (kept in memory, refreshed in the background)
+
+    await api_key_index.start()
+
+    #### Load API keys
+
+
     #### Initialize logger with your database
 
-    # Configure your collection names
-    #mongo_config = MongoLogConfig(
-    #     info_collection="info",
-    #     warning_collection="warning",
-    #     error_collection="error"
-    # )
-    # mongo_logger_db_name = "logs_db"
-    # await initialize_logger(db_name=mongo_logger_db_name, mongo_config=mongo_config)
+    if FILE_LOGGING_ENABLED or MONGO_LOGGING_ENABLED:
+        # Configure your collection names
+        mongo_config = MongoLogConfig(
+            info_collection="info",
+            warning_collection="warning",
+            error_collection="error"
+        )
+        await initialize_logger(
+            db_name=MONGO_LOGGING_DB_NAME,
+            mongo_config=mongo_config,
+            use_mongo=MONGO_LOGGING_ENABLED,
+            use_files=FILE_LOGGING_ENABLED
+        )
 
     #### Initialize logger with your database
 
+
+    # Event loop lag metric + watchdog logging the stack of blocking calls
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+    # Background jobs submitted through /jobs (services/jobs.py)
+    register_sample_jobs(job_engine)
+    job_engine.start()
+
+    # Per-minute/hour request rollups behind /monitoring (needs MONITORING_BACKEND)
+    rollup_scheduler.start(monitoring_handler)
+
+    # Several workers (server.py): share this worker's metrics so /metrics covers the host
+    snapshot_task = None
+    if METRICS_MULTIPROC_DIR:
+        snapshot_task = asyncio.create_task(
+            write_snapshots_periodically(METRICS_MULTIPROC_DIR, METRICS_SNAPSHOT_INTERVAL_SECONDS)
+        )
+
     yield
 
     # Shutdown code
     print("Shutting down...")
 
-    await mongo_db_instance.close()
+    await loop_monitor.stop()
+
+    await api_key_index.stop()
+
+    await rollup_scheduler.stop()
+
+    # Let running jobs finish (up to JOB_SHUTDOWN_GRACE_SECONDS) before the databases close
+    await job_engine.stop()
+
+    # Write out any request logs still buffered by the monitoring writers
+    await flush_monitoring()
+
+    # Last metrics snapshot, after the final requests and flushes are counted
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        await asyncio.gather(snapshot_task, return_exceptions=True)
+        await asyncio.to_thread(write_snapshot, METRICS_MULTIPROC_DIR, metrics_registry.snapshot())
+
+    # Close the pooled outbound HTTP connections
+    await close_http_client()
+
+    # Drain the log queue and flush buffered Mongo log entries
+    await cleanup_logger()
+
+    if MONGO_ENABLED:
+        from database.mongo import mongo_db_instance
+        await mongo_db_instance.close()
+
+    if MYSQL_ENABLED:
+        from database.mysql_main_db import close_db
+        await close_db()
     
 
    
@@ -75,6 +183,7 @@ app = FastAPI(
         {"url": "http://127.0.0.1:8000", "description": "Development server"},
     ],
     docs_url="/pdocs",
+    default_response_class=FastJSONResponse,  # orjson-backed, see utils/responses.py
     lifespan=lifespan
 )
 
@@ -93,19 +202,40 @@ app.add_middleware(
     expose_headers=[API_KEY_HEADER_NAME],  # Allow frontend to read this header if needed
 )
 
+#compress large responses (gzip, or brotli/zstd when installed)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+#profile requests picked by a signed header or the sampling rate (log/profiles)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 #add the authentication middleware
 app.add_middleware(APIKeyMiddleware)
 
 
 #### Add API monitoring
 
-# mongo_handler = MongoHandler(
-#     connection_string=MONGO_CONNECTION_STRING,
-#     db_name="pk_api_monitor",
-#     collection_name="data"
-# )
-
-# app.add_middleware(MonitoringMiddleware, db_handler=mongo_handler)
+# MONITORING_BACKEND=mongo|mysql also stores every request. The handler only
+# imports its driver and connects on the first write. With "none" only the
+# in-memory per-route counters and latency histograms served on /metrics are kept.
+monitoring_handler = None
+if MONITORING_ENABLED:
+    monitoring_handler = build_monitoring_handler(
+        MONITORING_BACKEND, db_name=MONITORING_DB_NAME, collection_name=MONITORING_COLLECTION_NAME
+    )
+
+    # Request logs are buffered and written in batches by a background task.
+    # overflow_policy: "drop_oldest", "drop_newest" or "block" when the buffer is full
+    monitoring_writer = BatchWriter(
+        monitoring_handler,
+        max_queue_size=10000,
+        batch_size=500,
+        flush_interval=1.0,
+        overflow_policy="drop_oldest"
+    ) if monitoring_handler is not None else None
+
+    app.add_middleware(MonitoringMiddleware, db_handler=monitoring_handler, writer=monitoring_writer)
 
 #### Add API monitoring
 
@@ -135,6 +265,11 @@ app.openapi = custom_openapi
 
 #add new routers
 app.include_router(sample.router, tags=["Sample"])
+app.include_router(jobs.router, tags=["Jobs"])
+app.include_router(batch.router, tags=["Batch"])
+app.include_router(metrics.router, tags=["Monitoring"])
+app.include_router(monitoring.router, tags=["Monitoring"])
+app.include_router(health.router, tags=["Monitoring"])
 
 
 
@@ -142,11 +277,11 @@ app.include_router(sample.router, tags=["Sample"])
 @app.get("/health-check")
 async def read_health():
     try:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200, content={"status": "healthy"}
         )
     except Exception as ex:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=503, content={"status": "unhealthy", "details": str(ex)}
         )
 
@@ -157,7 +292,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         #    f"An HTTP error occurred: {exc.detail}",
         #    extra={"request_path": request.url.path},
         # )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=exc.status_code,
             content={"message": exc.detail},
         )
@@ -170,7 +305,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         # logger.error(
         #    f"An unexpected error occurred while processing path {request.url.path}: {exc}"
         # )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import os
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Upper bounds in seconds. Roughly geometric so p50/p95/p99 interpolated from
+# the buckets stay within a few percent from 1ms up to 30s.
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.002, 0.003, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.03, 0.05,
+    0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0
+)
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Fixed-bucket histogram. observe() is a bisect and three additions."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        # One extra slot for values above the last bound (the +Inf bucket)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile by linear interpolation inside its bucket."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    # Nothing better to report than the last finite bound
+                    return self.bounds[-1]
+                upper = self.bounds[i]
+                return lower + (upper - lower) * ((rank - cumulative) / count)
+            cumulative += count
+        return self.bounds[-1]
+
+
+class CounterFamily:
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class GaugeFamily(CounterFamily):
+    type_name = "gauge"
+
+    def set(self, labels: Tuple, value: float):
+        self.values[labels] = value
+
+
+class HistogramFamily:
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.quantiles = tuple(quantiles)
+        self.series: Dict[Tuple, Histogram] = {}
+
+    def observe(self, labels: Tuple, value: float):
+        histogram = self.series.get(labels)
+        if histogram is None:
+            histogram = self.series[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        series = sorted(self.series.items())
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_format_value(histogram.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {histogram.count}")
+
+        if self.quantiles:
+            # Precomputed percentiles, so dashboards don't need histogram_quantile()
+            name = self.name.replace("_seconds", "_quantile_seconds") if self.name.endswith("_seconds") else f"{self.name}_quantile"
+            lines.append(f"# HELP {name} Estimated quantiles of {self.name}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, histogram in series:
+                for q in self.quantiles:
+                    value = histogram.quantile(q)
+                    if value is not None:
+                        extra = f'quantile="{q}"'
+                        lines.append(f"{name}{_labels(self.label_names, labels, extra)} {_format_value(round(value, 6))}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metric families rendered in the Prometheus text format.
+
+    Everything runs on the event loop thread, so updates are plain dict and
+    list operations with no locking.
+    """
+
+    def __init__(self):
+        self.families: Dict[str, object] = {}
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = cls(name, *args, **kwargs)
+        return family
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> CounterFamily:
+        return self._get_or_create(CounterFamily, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> GaugeFamily:
+        return self._get_or_create(GaugeFamily, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (), **kwargs) -> HistogramFamily:
+        return self._get_or_create(HistogramFamily, name, documentation, label_names, **kwargs)
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """Add a callable returning extra exposition lines, evaluated at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families.values():
+            lines.extend(family.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable copy of every family plus the collector output, for merging across workers."""
+        families = {}
+        for name, family in self.families.items():
+            entry = {
+                "type": family.type_name,
+                "documentation": family.documentation,
+                "label_names": list(family.label_names),
+            }
+            if isinstance(family, HistogramFamily):
+                entry["buckets"] = list(family.buckets)
+                entry["quantiles"] = list(family.quantiles)
+                entry["series"] = [
+                    [[str(value) for value in labels], histogram.counts, histogram.sum, histogram.count]
+                    for labels, histogram in family.series.items()
+                ]
+            else:
+                entry["values"] = [[[str(value) for value in labels], value] for labels, value in family.values.items()]
+            families[name] = entry
+        collected = []
+        for collector in self.collectors:
+            collected.extend(collector())
+        return {"pid": os.getpid(), "time": time.time(), "families": families, "collected": collected}
+
+
+metrics_registry = MetricsRegistry()
+
+http_requests_total = metrics_registry.counter(
+    "http_requests_total", "Total HTTP requests", ("method", "route", "status")
+)
+http_request_errors_total = metrics_registry.counter(
+    "http_request_errors_total", "HTTP requests that ended with a 5xx status", ("method", "route", "status")
+)
+http_request_duration_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds", ("method", "route", "status")
+)
+
+
+def observe_request(method: str, route: str, status_code: int, duration: float):
+    """Record one finished request. Called by MonitoringMiddleware for every request."""
+    labels = (method, route, str(status_code))
+    http_requests_total.inc(labels)
+    if status_code >= 500:
+        http_request_errors_total.inc(labels)
+    http_request_duration_seconds.observe(labels, duration)
+
+
+def render_metrics() -> str:
+    return metrics_registry.render()
+
+
+# Multi-worker aggregation
+#
+# With several worker processes each one only sees its own requests. When
+# METRICS_MULTIPROC_DIR is set (server.py does this for workers > 1) every
+# worker writes a snapshot of its registry there every few seconds, and the
+# worker answering /metrics merges all snapshots: counters and histograms
+# are summed, gauges get a "worker" label and are dropped once their worker
+# has exited.
+
+_SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_snapshot(directory: str, snapshot: Dict[str, Any]):
+    """Atomically replace this worker's snapshot file. Blocking; run off the event loop."""
+    path = os.path.join(directory, f"metrics-{snapshot['pid']}.json")
+    temporary = path + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(snapshot, file)
+    os.replace(temporary, path)
+
+
+def read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.startswith("metrics-") and name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue  # Being replaced right now; the next scrape will see it
+    return snapshots
+
+
+def _merge_collected(families: Dict[str, Dict], lines: Iterable[str], worker: str, alive: bool):
+    current = None
+    for line in lines:
+        if line.startswith("# HELP "):
+            name, _, documentation = line[7:].partition(" ")
+            current = families.setdefault(name, {"documentation": documentation, "type": "untyped", "samples": {}})
+            continue
+        if line.startswith("# TYPE "):
+            name, _, type_name = line[7:].partition(" ")
+            current = families.setdefault(name, {"documentation": "", "type": type_name, "samples": {}})
+            current["type"] = type_name
+            continue
+        match = _SAMPLE_LINE.match(line)
+        if match is None or current is None:
+            continue
+        sample, labels, value = match.group(1), match.group(2) or "", float(match.group(3))
+        samples = current["samples"]
+        if current["type"] in ("counter", "histogram"):
+            samples[(sample, labels)] = samples.get((sample, labels), 0.0) + value
+        elif alive:
+            worker_label = f'worker="{worker}"'
+            labels = labels[:-1] + "," + worker_label + "}" if labels else "{" + worker_label + "}"
+            samples[(sample, labels)] = value
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> str:
+    """Render the sum of several workers' snapshots in the Prometheus text format."""
+    registry = MetricsRegistry()
+    collected: Dict[str, Dict] = {}
+    for snapshot in sorted(snapshots, key=lambda item: item["pid"]):
+        worker = str(snapshot["pid"])
+        alive = _pid_alive(snapshot["pid"])
+        for name, entry in snapshot["families"].items():
+            label_names = tuple(entry["label_names"])
+            if entry["type"] == "histogram":
+                family = registry.histogram(
+                    name, entry["documentation"], label_names, buckets=entry["buckets"], quantiles=entry["quantiles"]
+                )
+                for labels, counts, total, count in entry["series"]:
+                    histogram = Histogram(family.buckets)
+                    histogram.counts, histogram.sum, histogram.count = list(counts), total, count
+                    existing = family.series.get(tuple(labels))
+                    if existing is None:
+                        family.series[tuple(labels)] = histogram
+                    else:
+                        existing.merge(histogram)
+            elif entry["type"] == "counter":
+                family = registry.counter(name, entry["documentation"], label_names)
+                for labels, value in entry["values"]:
+                    family.inc(tuple(labels), value)
+            elif alive:
+                family = registry.gauge(name, entry["documentation"], label_names + ("worker",))
+                for labels, value in entry["values"]:
+                    family.set(tuple(labels) + (worker,), value)
+        _merge_collected(collected, snapshot["collected"], worker, alive)
+
+    lines = [registry.render().rstrip("\n")]
+    for name, family in collected.items():
+        lines.append(f"# HELP {name} {family['documentation']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for (sample, labels), value in family["samples"].items():
+            lines.append(f"{sample}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_host_metrics(directory: str, own_snapshot: Dict[str, Any]) -> str:
+    """Write this worker's fresh snapshot, then merge every worker's. Blocking; run off the event loop."""
+    write_snapshot(directory, own_snapshot)
+    return merge_snapshots(read_snapshots(directory))
+
+
+async def write_snapshots_periodically(directory: str, interval: float):
+    """Lifespan task keeping this worker's snapshot fresh for whichever worker serves /metrics."""
+    while True:
+        await asyncio.to_thread(write_snapshot, directory, metrics_registry.snapshot())
+        await asyncio.sleep(interval)
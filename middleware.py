@@ -1,28 +1,94 @@
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from fastapi import Request
 from fastapi.security import APIKeyHeader
-from starlette.middleware.base import BaseHTTPMiddleware
-from utils.config_loader import ENVIRONMENT,API_KEY_HEADER_NAME, API_KEY_PASSPHRASE
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
+from api_keys import ApiKeyIndex, api_key_index
+from rate_limit import RateLimiter, build_rate_limiter, rate_limit_headers
+from utils.config_loader import ENVIRONMENT,API_KEY_HEADER_NAME
 
 
-WHITELISTED_PATHS = ["/pdocs", "/openapi.json", "/health-check", "/"]
+WHITELISTED_PATHS = ["/pdocs", "/openapi.json", "/health-check", "/ready", "/"]
+
+# Scope key carrying the identity /batch already authenticated into its
+# sub-requests. Only code in this process can put keys in a scope, so a
+# client cannot forge it.
+BATCH_IDENTITY_SCOPE_KEY = "batch.api_key"
 
 
 api_key_header = APIKeyHeader(name=API_KEY_HEADER_NAME, auto_error=True)
 
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class APIKeyMiddleware:
+    """
+    Raw ASGI middleware checking the API key header.
+
+    Runs inline in the request task instead of going through
+    BaseHTTPMiddleware, so it adds no extra task or memory stream per request
+    and streaming responses pass straight through.
+
+    Keys are resolved through the in-memory ApiKeyIndex (api_keys.py): a hash
+    and a dict lookup, no database access. The resolved ApiKeyIdentity is put
+    on request.state.api_key for routes, monitoring and rate limiting.
+
+    When rate limiting is enabled (RATE_LIMIT_ENABLED, see rate_limit.py)
+    each API key, or client address without one, gets a token bucket per
+    route class. Over-limit requests get a 429 before reaching the app;
+    every limited response carries X-RateLimit-* headers.
+
+    Sub-requests dispatched by /batch reuse the batch's identity instead of
+    authenticating again, but each one is still rate limited.
+    """
+
+    def __init__(self, app: ASGIApp, rate_limiter: Optional[RateLimiter] = None, key_index: Optional[ApiKeyIndex] = None):
+        self.app = app
+        self.whitelisted_paths = frozenset(WHITELISTED_PATHS)
+        self.header_name = API_KEY_HEADER_NAME.lower().encode("latin-1") if API_KEY_HEADER_NAME else b""
+        self.key_index = key_index or api_key_index
+        self.rate_limiter = rate_limiter or build_rate_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.whitelisted_paths:
+            await self.app(scope, receive, send)
+            return
+
+        identity = scope.get(BATCH_IDENTITY_SCOPE_KEY)
+        if identity is None:
+            api_key = None
+            for name, value in scope["headers"]:
+                if name == self.header_name:
+                    api_key = value
+                    break
+            identity = self.key_index.authenticate(api_key)
         # Check if running in development mode
-        if ENVIRONMENT == 'dev':
-            return await call_next(request)
-        
-        if request.url.path not in WHITELISTED_PATHS:
-            api_key = request.headers.get(API_KEY_HEADER_NAME)
-            if api_key != API_KEY_PASSPHRASE:
-                return JSONResponse(
-                    status_code=401, content={"detail": "Invalid API key"}
-                )
-        return await call_next(request)
+        if identity is None and ENVIRONMENT != 'dev':
+            response = JSONResponse(
+                status_code=401, content={"detail": "Invalid API key"}
+            )
+            await response(scope, receive, send)
+            return
+        if identity is not None:
+            scope.setdefault("state", {})["api_key"] = identity
+
+        if self.rate_limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        if identity is not None:
+            bucket = ("key:" + identity.key_id).encode("utf-8")
+        else:
+            bucket = ("ip:" + (client[0] if client else "")).encode("latin-1")
+        _, decision = self.rate_limiter.check(bucket, scope["path"])
+        headers = rate_limit_headers(decision)
+        if not decision.allowed:
+            response = JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"})
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,16 @@
+from sqlalchemy import Boolean, Column, DateTime, String, Text
+
+from database.mysql_main_db import Base
+
+
+class ApiKey(Base):
+    """API key as stored: only the HMAC of the key is kept (see api_keys.hash_key)."""
+
+    __tablename__ = "api_keys"
+
+    key_id = Column(String(32), primary_key=True)
+    tenant = Column(String(128), nullable=False, index=True)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    scopes = Column(Text, nullable=False, default="")  # space-separated
+    revoked = Column(Boolean, nullable=False, default=False)
+    expires_at = Column(DateTime, nullable=True)
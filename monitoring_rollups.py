@@ -0,0 +1,234 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from metrics import DEFAULT_LATENCY_BUCKETS, Histogram
+from monitoring import DatabaseHandler
+from utils.config_loader import (
+    MONITORING_ROLLUP_INTERVAL_SECONDS,
+    MONITORING_ROLLUP_LOOKBACK_MINUTES,
+    MONITORING_RAW_RETENTION_DAYS,
+)
+
+
+# Same bucket layout as the /metrics latency histograms, in milliseconds
+LATENCY_BOUNDS_MS = tuple(round(bound * 1000, 3) for bound in DEFAULT_LATENCY_BUCKETS)
+
+GRANULARITIES = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+
+RollupKey = Tuple[datetime, str, str, int]
+
+
+def _floor(moment: datetime, granularity: str) -> datetime:
+    moment = moment.replace(second=0, microsecond=0)
+    return moment.replace(minute=0) if granularity == "hour" else moment
+
+
+def _new_rollup(bucket: datetime, method: str, route: str, status_code: int) -> Dict[str, Any]:
+    return {
+        "bucket": bucket,
+        "method": method,
+        "route": route,
+        "status_code": status_code,
+        "count": 0,
+        "sum_ms": 0.0,
+        "max_ms": 0.0,
+        "histogram": [0] * (len(LATENCY_BOUNDS_MS) + 1),
+    }
+
+
+def _merge_into(target: Dict[str, Any], rollup: Dict[str, Any]):
+    target["count"] += rollup["count"]
+    target["sum_ms"] += rollup["sum_ms"]
+    target["max_ms"] = max(target["max_ms"], rollup["max_ms"])
+    for i, count in enumerate(rollup["histogram"]):
+        target["histogram"][i] += count
+
+
+def minute_rollups(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold DatabaseHandler.aggregate_raw() rows (one per latency bucket) into one rollup per series."""
+    rollups: Dict[RollupKey, Dict[str, Any]] = {}
+    for row in rows:
+        key = (row["minute"], row["method"], row["route"], row["status_code"])
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = _new_rollup(*key)
+        rollup["count"] += row["count"]
+        rollup["sum_ms"] += row["sum_ms"]
+        rollup["max_ms"] = max(rollup["max_ms"], row["max_ms"])
+        rollup["histogram"][min(row["bucket_index"], len(LATENCY_BOUNDS_MS))] += row["count"]
+    return list(rollups.values())
+
+
+def coarser_rollups(rollups: Iterable[Dict[str, Any]], granularity: str) -> List[Dict[str, Any]]:
+    """Merge finer rollups into `granularity` buckets (minutes into hours)."""
+    merged: Dict[RollupKey, Dict[str, Any]] = {}
+    for rollup in rollups:
+        key = (_floor(rollup["bucket"], granularity), rollup["method"], rollup["route"], rollup["status_code"])
+        target = merged.get(key)
+        if target is None:
+            target = merged[key] = _new_rollup(*key)
+        _merge_into(target, rollup)
+    return list(merged.values())
+
+
+def summarize(rollups: Iterable[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    """Throughput, error rates and latency percentiles (ms) over a set of rollups."""
+    histogram = Histogram(LATENCY_BOUNDS_MS)
+    server_errors = client_errors = 0
+    max_ms = 0.0
+    for rollup in rollups:
+        for i, count in enumerate(rollup["histogram"]):
+            histogram.counts[i] += count
+        histogram.count += rollup["count"]
+        histogram.sum += rollup["sum_ms"]
+        max_ms = max(max_ms, rollup["max_ms"])
+        if rollup["status_code"] >= 500:
+            server_errors += rollup["count"]
+        elif rollup["status_code"] >= 400:
+            client_errors += rollup["count"]
+
+    # Counts are sums of sample weights: estimates of the real number of requests
+    count = histogram.count
+    summary = {
+        "count": round(count),
+        "rps": round(count / seconds, 3) if seconds else 0.0,
+        "error_rate": round(server_errors / count, 4) if count else 0.0,
+        "client_error_rate": round(client_errors / count, 4) if count else 0.0,
+        "avg_ms": round(histogram.sum / count, 2) if count else None,
+        "max_ms": round(max_ms, 2) if count else None,
+    }
+    for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        value = histogram.quantile(q)
+        # Interpolation can overshoot the slowest request actually seen
+        summary[name] = round(min(value, max_ms), 2) if value is not None else None
+    return summary
+
+
+class RollupScheduler:
+    """
+    Rolls raw request records into per-minute and per-hour aggregates.
+
+    Every `interval` seconds the worker holding the lease (one per
+    deployment, see DatabaseHandler.try_lease) recomputes the last
+    `lookback_minutes` complete minutes from raw records, so records written
+    late by the batch writers are still counted, plus anything older than
+    that since the last run (after downtime), up to the raw retention. The
+    hours those minutes fall in are then rebuilt from the minute rollups.
+    Rollups are upserted, so recomputing a bucket is harmless. Raw grouping
+    happens in the database; only one row per series and latency bucket
+    comes back.
+    """
+
+    def __init__(
+        self,
+        interval: float = MONITORING_ROLLUP_INTERVAL_SECONDS,
+        lookback_minutes: int = MONITORING_ROLLUP_LOOKBACK_MINUTES,
+        chunk: timedelta = timedelta(hours=1)
+    ):
+        self.interval = interval
+        self.lookback = timedelta(minutes=lookback_minutes)
+        self.chunk = chunk
+        self.handler: Optional[DatabaseHandler] = None
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"runs": 0, "skipped_no_lease": 0, "failures": 0, "minute_rollups": 0, "hour_rollups": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    async def rollup_range(self, start: datetime, end: datetime):
+        """Recompute minute rollups in [start, end) and the hour rollups covering them."""
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + self.chunk, end)
+            rows = await self.handler.aggregate_raw(chunk_start, chunk_end, LATENCY_BOUNDS_MS)
+            rollups = minute_rollups(rows)
+            await self.handler.save_rollups("minute", rollups)
+            self.stats["minute_rollups"] += len(rollups)
+            chunk_start = chunk_end
+
+        hour = _floor(start, "hour")
+        while hour < end:
+            minutes = await self.handler.load_rollups("minute", hour, hour + GRANULARITIES["hour"])
+            hours = coarser_rollups(minutes, "hour")
+            await self.handler.save_rollups("hour", hours)
+            self.stats["hour_rollups"] += len(hours)
+            hour += GRANULARITIES["hour"]
+
+    async def run_once(self, now: Optional[datetime] = None) -> bool:
+        """One rollup pass; False when another worker holds the lease."""
+        await self.handler.initialize()
+        # Records carry naive UTC timestamps (datetime.utcnow() in MonitoringMiddleware)
+        now = now or datetime.utcnow()
+        if not await self.handler.try_lease(self.holder, self.interval * 3):
+            self.stats["skipped_no_lease"] += 1
+            return False
+
+        end = _floor(now, "minute")
+        start = end - self.lookback
+        watermark = await self.handler.get_watermark()
+        if watermark is not None and watermark < start:
+            start = max(watermark, end - timedelta(days=MONITORING_RAW_RETENTION_DAYS))
+        await self.rollup_range(start, end)
+        await self.handler.set_watermark(end)
+        await self.handler.purge_expired(now)
+        self.stats["runs"] += 1
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as ex:
+                self.stats["failures"] += 1
+                print(f"Monitoring rollup failed: {ex}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, handler: Optional[DatabaseHandler]):
+        """Start rolling up for `handler`; a no-op without monitoring storage."""
+        self.handler = handler
+        if handler is None or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def summary(self, start: datetime, end: datetime, granularity: str,
+                      route: Optional[str] = None, method: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per route and method statistics over [start, end), busiest first."""
+        rollups = await self.handler.load_rollups(granularity, start, end, route=route, method=method)
+        series: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for rollup in rollups:
+            series.setdefault((rollup["method"], rollup["route"]), []).append(rollup)
+        seconds = (end - start).total_seconds()
+        results = [
+            dict({"method": method_, "route": route_}, **summarize(items, seconds))
+            for (method_, route_), items in series.items()
+        ]
+        return sorted(results, key=lambda result: -result["count"])
+
+    async def timeseries(self, start: datetime, end: datetime, granularity: str,
+                         route: Optional[str] = None, method: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One point per bucket in [start, end), empty buckets included."""
+        rollups = await self.handler.load_rollups(granularity, start, end, route=route, method=method)
+        by_bucket: Dict[datetime, List[Dict[str, Any]]] = {}
+        for rollup in rollups:
+            by_bucket.setdefault(rollup["bucket"], []).append(rollup)
+        step = GRANULARITIES[granularity]
+        points = []
+        bucket = _floor(start, granularity)
+        while bucket < end:
+            points.append(dict({"bucket": bucket}, **summarize(by_bucket.get(bucket, ()), step.total_seconds())))
+            bucket += step
+        return points
+
+
+rollup_scheduler = RollupScheduler()
@@ -0,0 +1,344 @@
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.config_loader import (
+    PROFILING_MODE,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SECRET,
+    PROFILING_HEADER,
+    PROFILING_INTERVAL_MS,
+    PROFILING_DIR,
+    PROFILING_MAX_PROFILES,
+    PROFILING_MAX_MB,
+)
+
+
+PROFILING_MODES = ("sampling", "deterministic")
+
+Stack = Tuple[str, ...]
+
+
+def sign_profile_token(secret: Optional[str] = PROFILING_SECRET, ttl: int = 300) -> str:
+    """
+    Value for the profiling header, valid for `ttl` seconds:
+        curl -H "X-Profile: $(python -c 'import profiling; print(profiling.sign_profile_token())')" ...
+    """
+    if not secret:
+        raise ValueError("PROFILING_SECRET is not set: the signed header trigger is disabled")
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret.encode("utf-8"), expires.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(token: str, secret: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode("utf-8"), expires.encode("utf-8"), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's stack every `interval` seconds from a
+    background thread. Only samples taken while this request's code is on
+    the stack (the profiling middleware's frame is an ancestor) are kept,
+    trimmed to the frames below it, so other requests sharing the loop do
+    not show up. Sync endpoints running in the thread pool are not seen.
+
+    Each sample is weighted by the time since the previous one: a thread
+    running pure Python only releases the GIL every sys.getswitchinterval()
+    (5 ms by default), so samples can arrive later than asked.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()  # stack -> microseconds
+        self.idle_us = 0  # this request was suspended (awaiting I/O or other tasks)
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, anchor_frame):
+        thread_id = threading.get_ident()
+        stop_code = SamplingProfiler.stop.__code__
+
+        def run():
+            last = time.perf_counter()
+            while not self._stop.wait(self.interval):
+                frame = sys._current_frames().get(thread_id)
+                now = time.perf_counter()
+                elapsed_us = int((now - last) * 1_000_000)
+                last = now
+                stack = []
+                while frame is not None and frame is not anchor_frame:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                self.samples += 1
+                if frame is None:
+                    self.idle_us += elapsed_us
+                elif stack and stack[-1] is not stop_code:
+                    self.stacks[tuple(_label(code) for code in reversed(stack))] += elapsed_us
+
+        self._thread = threading.Thread(target=run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> Dict[Stack, int]:
+        """Stack -> microseconds."""
+        return dict(self.stacks)
+
+    def summary(self) -> str:
+        busy_ms = sum(self.stacks.values()) / 1000
+        return (
+            f"{self.samples} samples every {self.interval * 1000:g} ms: ~{busy_ms:.1f} ms running this "
+            f"request, ~{self.idle_us / 1000:.1f} ms awaiting I/O or other tasks"
+        )
+
+
+class DeterministicProfiler:
+    """
+    cProfile around the request. cProfile sees every call on the thread, so
+    concurrent requests on the same event loop are included too; use it on
+    a quiet instance or with sampling for busy ones.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self, anchor_frame):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def collapsed(self, max_depth: int = 64) -> Dict[Stack, int]:
+        """
+        Approximate stacks rebuilt from cProfile's caller graph: a function's
+        time is split between its callers in proportion to the time each
+        call edge accounts for (the approach used by flameprof).
+        """
+        stats = pstats.Stats(self.profile).stats
+        callees: Dict[tuple, List[Tuple[tuple, float]]] = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+        roots = [func for func, entry in stats.items() if not any(caller in stats for caller in entry[4])]
+
+        def name(func) -> str:
+            filename, line, function = func
+            return f"{function} ({os.path.basename(filename)}:{line})" if line else function
+
+        stacks: Dict[Stack, int] = {}
+
+        def walk(func, path: Stack, fraction: float, seen: frozenset):
+            _, _, tottime, cumtime, _ = stats[func]
+            path = path + (name(func),)
+            self_us = int(tottime * fraction * 1_000_000)
+            if self_us:
+                stacks[path] = stacks.get(path, 0) + self_us
+            if len(path) >= max_depth:
+                return
+            for child, edge_cumtime in callees.get(func, ()):
+                child_cumtime = stats[child][3]
+                if child in seen or not child_cumtime:
+                    continue
+                walk(child, path, fraction * edge_cumtime / child_cumtime, seen | {child})
+
+        for root in roots:
+            walk(root, (), 1.0, frozenset({root}))
+        return stacks
+
+    def summary(self) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(40)
+        stats.print_callees(20)
+        return out.getvalue()
+
+
+def render_call_tree(stacks: Dict[Stack, int], min_share: float = 0.005) -> str:
+    """Indented call tree with inclusive time per node, largest first."""
+    tree: Dict = {}
+    for stack, micros in stacks.items():
+        node = tree
+        for frame in stack:
+            child = node.setdefault(frame, {"us": 0, "children": {}})
+            child["us"] += micros
+            node = child["children"]
+    total = sum(stacks.values()) or 1
+    lines = []
+
+    def render(children: Dict, depth: int):
+        for frame, child in sorted(children.items(), key=lambda item: -item[1]["us"]):
+            if child["us"] / total < min_share:
+                continue
+            lines.append(f"{'  ' * depth}{child['us'] / 1000:9.2f} ms {child['us'] / total:6.1%}  {frame}")
+            render(child["children"], depth + 1)
+
+    render(tree, 0)
+    return "\n".join(lines)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("_") or "root"
+
+
+def prune_profiles(directory: str, max_profiles: int = PROFILING_MAX_PROFILES, max_mb: float = PROFILING_MAX_MB):
+    """Delete the oldest profiles (both files) beyond `max_profiles` or `max_mb` in total; 0 disables a limit."""
+    profiles: Dict[str, List] = {}  # base path -> [newest mtime, total bytes, paths]
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            base, extension = os.path.splitext(entry.path)
+            if extension not in (".txt", ".collapsed") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            profile = profiles.setdefault(base, [0.0, 0, []])
+            profile[0] = max(profile[0], stat.st_mtime)
+            profile[1] += stat.st_size
+            profile[2].append(entry.path)
+
+    newest_first = sorted(profiles.values(), key=lambda profile: -profile[0])
+    kept = total_bytes = 0
+    for _, size, paths in newest_first:
+        kept += 1
+        total_bytes += size
+        if (max_profiles and kept > max_profiles) or (max_mb and total_bytes > max_mb * 1024 * 1024):
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Another worker pruned it first
+
+
+def write_profile(directory: str, profile_id: str, method: str, route: str, latency_ms: float,
+                  call_tree: str, collapsed: Dict[Stack, int]) -> str:
+    """Writes <id>_<METHOD>_<route>_<latency>ms.txt and .collapsed; returns the .txt path."""
+    from utils.logger_setup import create_log_directories
+
+    create_log_directories()
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{profile_id}_{method}_{_slug(route)}_{latency_ms:.0f}ms")
+    with open(base + ".txt", "w") as file:
+        file.write(call_tree)
+    with open(base + ".collapsed", "w") as file:
+        # Brendan Gregg's folded format: flamegraph.pl, speedscope, inferno
+        for stack, micros in sorted(collapsed.items()):
+            file.write(";".join(frame.replace(";", ":") for frame in stack) + f" {micros}\n")
+    prune_profiles(directory)
+    return base + ".txt"
+
+
+class ProfilingMiddleware:
+    """
+    Raw ASGI middleware profiling selected requests.
+
+    A request is profiled when it carries a valid signed PROFILING_HEADER
+    token (see sign_profile_token) or is picked by PROFILING_SAMPLE_RATE.
+    The profile is written under log/profiles/ after the response is sent,
+    named after the route and latency, and the response gets an X-Profile-Id
+    header. The oldest profiles are deleted past PROFILING_MAX_PROFILES or
+    PROFILING_MAX_MB. Requests that are not picked cost one random() call and, when a
+    secret is configured, one header scan.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        mode: str = PROFILING_MODE,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        secret: Optional[str] = PROFILING_SECRET,
+        header: str = PROFILING_HEADER,
+        interval: float = PROFILING_INTERVAL_MS / 1000,
+        directory: str = PROFILING_DIR
+    ):
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"PROFILING_MODE must be one of {PROFILING_MODES}, got {mode!r}")
+        self.app = app
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.header = header.lower().encode("latin-1")
+        self.interval = interval
+        self.directory = directory
+        # cProfile is process-wide; only one deterministic profile at a time
+        self._deterministic_busy = False
+
+    def _triggered(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == self.header:
+                    return verify_profile_token(value.decode("latin-1"), self.secret)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._triggered(scope):
+            await self.app(scope, receive, send)
+            return
+        if self.mode == "deterministic":
+            if self._deterministic_busy:
+                await self.app(scope, receive, send)
+                return
+            self._deterministic_busy = True
+            profiler = DeterministicProfiler()
+        else:
+            profiler = SamplingProfiler(self.interval)
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        profiler.start(sys._getframe())
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            latency_ms = (time.perf_counter() - start) * 1000
+            if self.mode == "deterministic":
+                self._deterministic_busy = False
+            route = scope.get("route")
+            collapsed = profiler.collapsed()
+            call_tree = "\n".join([
+                f"{scope['method']} {scope['path']} (route {route.path if route else scope['path']})",
+                f"Latency {latency_ms:.2f} ms, profiler: {self.mode}",
+                profiler.summary() if self.mode == "sampling" else "",
+                render_call_tree(collapsed),
+                "" if self.mode == "sampling" else "\n" + profiler.summary(),
+            ])
+            try:
+                # File writes go to a thread so the event loop is not blocked
+                await asyncio.to_thread(
+                    write_profile, self.directory, profile_id, scope["method"],
+                    route.path if route else scope["path"], latency_ms, call_tree, collapsed,
+                )
+            except Exception as ex:
+                print(f"Failed to write profile {profile_id}: {ex}")
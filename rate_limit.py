@@ -0,0 +1,225 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from metrics import metrics_registry
+from utils.config_loader import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMIT_RULES,
+    RATE_LIMIT_SHARED_PATH,
+    RATE_LIMIT_SHARED_SLOTS,
+)
+
+
+_PERIODS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+rate_limit_rejected_total = metrics_registry.counter(
+    "rate_limit_rejected_total", "Requests rejected with 429 by the rate limiter", ("route_class",)
+)
+
+
+class Rule(NamedTuple):
+    """Token bucket: holds up to `capacity` tokens, refilled at `rate` tokens per second."""
+
+    capacity: float
+    rate: float
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until one token is available (0 when allowed)
+    reset_after: float  # seconds until the bucket is full again
+
+
+def parse_rule(spec: str) -> Rule:
+    """
+    Parse "<count>/<s|m|h>[:<burst>]", e.g. "100/m" or "5/s:20". The burst
+    (bucket size) defaults to the count.
+    """
+    spec = spec.strip()
+    rate_part, _, burst = spec.partition(":")
+    count, _, period = rate_part.partition("/")
+    if period not in _PERIODS:
+        raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '100/m' or '5/s:20'")
+    count = float(count)
+    return Rule(capacity=float(burst) if burst else count, rate=count / _PERIODS[period])
+
+
+def parse_rules(spec: str) -> List[Tuple[str, Rule]]:
+    """Parse "/llm=5/s:10,/batch=20/m" into (path prefix, rule) pairs."""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rule = item.partition("=")
+        rules.append((prefix.strip(), parse_rule(rule)))
+    return rules
+
+
+def _refill(tokens: float, updated: float, now: float, rule: Rule) -> float:
+    # max(): a clock step backwards must not remove tokens
+    return min(rule.capacity, tokens + max(now - updated, 0.0) * rule.rate)
+
+
+def _decide(tokens: float, rule: Rule) -> Tuple[float, Decision]:
+    """Take one token if available; returns the new token count and the decision."""
+    allowed = tokens >= 1.0
+    if allowed:
+        tokens -= 1.0
+    retry_after = 0.0 if allowed else (1.0 - tokens) / rule.rate
+    reset_after = (rule.capacity - tokens) / rule.rate
+    return tokens, Decision(allowed, int(rule.capacity), int(tokens), retry_after, reset_after)
+
+
+class MemoryBackend:
+    """Buckets in a dict; limits are per worker process."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[bytes, List[float]] = {}  # key -> [tokens, updated, full again at]
+
+    def acquire(self, key: bytes, rule: Rule, now: float) -> Decision:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [rule.capacity, now, now]
+        tokens = _refill(bucket[0], bucket[1], now, rule)
+        bucket[0], decision = _decide(tokens, rule)
+        bucket[1] = now
+        bucket[2] = now + decision.reset_after
+        return decision
+
+    def _prune(self, now: float):
+        # A bucket full again is the same as no bucket; each refills at its own rule's rate
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if now >= full_at]:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class SharedMemoryBackend:
+    """
+    Buckets in a memory-mapped file shared by every worker process on the
+    host, so N uvicorn workers enforce one limit instead of N.
+
+    The file is a set-associative table: a key hashes to a set of WAYS
+    slots (16-byte key digest, tokens, last update). Each acquire locks only
+    that set's byte range with fcntl, updates it in place and unlocks. When
+    a set is full, the least recently used slot is reused. Wall-clock time
+    is used because it is comparable across processes.
+    """
+
+    WAYS = 4
+    _SLOT = struct.Struct("16sdd")
+
+    def __init__(self, path: str, slots: int = 65536):
+        import fcntl  # POSIX only; imported here so the memory backend works everywhere
+
+        self._fcntl = fcntl
+        self.path = path
+        self.sets = max(slots // self.WAYS, 1)
+        self.set_size = self._SLOT.size * self.WAYS
+        size = self.sets * self.set_size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def acquire(self, key: bytes, rule: Rule, now: float) -> Decision:
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        offset = (int.from_bytes(digest[:8], "little") % self.sets) * self.set_size
+        fcntl = self._fcntl
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.set_size, offset)
+        try:
+            slot_offset, tokens, updated = self._find_slot(digest, offset, rule, now)
+            tokens, decision = _decide(_refill(tokens, updated, now, rule), rule)
+            self._SLOT.pack_into(self._map, slot_offset, digest, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.set_size, offset)
+        return decision
+
+    def _find_slot(self, digest: bytes, offset: int, rule: Rule, now: float) -> Tuple[int, float, float]:
+        oldest_offset, oldest_updated = offset, math.inf
+        for way in range(self.WAYS):
+            slot_offset = offset + way * self._SLOT.size
+            slot_digest, tokens, updated = self._SLOT.unpack_from(self._map, slot_offset)
+            if slot_digest == digest:
+                return slot_offset, tokens, updated
+            if updated < oldest_updated:
+                oldest_offset, oldest_updated = slot_offset, updated
+        # New key: reuse the least recently used (or an empty) slot, starting full
+        return oldest_offset, rule.capacity, now
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class RateLimiter:
+    """
+    Token-bucket limits per API key and route class.
+
+    A request's route class is the longest configured path prefix it falls
+    under, or "default". Each (key, route class) pair has its own bucket.
+    """
+
+    def __init__(self, default_rule: Rule, rules: Sequence[Tuple[str, Rule]] = (), backend=None):
+        self.default_rule = default_rule
+        # Longest prefix first so "/llm/chat" wins over "/llm"
+        self.rules = sorted(rules, key=lambda item: len(item[0]), reverse=True)
+        self.backend = backend or MemoryBackend()
+        self._classes: Dict[str, Tuple[str, Rule]] = {}
+
+    def classify(self, path: str) -> Tuple[str, Rule]:
+        route_class = self._classes.get(path)
+        if route_class is None:
+            route_class = next(
+                ((prefix, rule) for prefix, rule in self.rules if path.startswith(prefix)),
+                ("default", self.default_rule),
+            )
+            if len(self._classes) < 10000:  # Paths with IDs in them would grow this forever
+                self._classes[path] = route_class
+        return route_class
+
+    def check(self, identity: bytes, path: str) -> Tuple[str, Decision]:
+        name, rule = self.classify(path)
+        decision = self.backend.acquire(identity + b"\0" + name.encode("utf-8"), rule, time.time())
+        if not decision.allowed:
+            rate_limit_rejected_total.inc((name,))
+        return name, decision
+
+
+def rate_limit_headers(decision: Decision) -> List[Tuple[bytes, bytes]]:
+    headers = [
+        (b"x-ratelimit-limit", str(decision.limit).encode()),
+        (b"x-ratelimit-remaining", str(decision.remaining).encode()),
+        (b"x-ratelimit-reset", str(math.ceil(decision.reset_after)).encode()),
+    ]
+    if not decision.allowed:
+        headers.append((b"retry-after", str(math.ceil(decision.retry_after)).encode()))
+    return headers
+
+
+def build_rate_limiter() -> Optional[RateLimiter]:
+    """Limiter configured by the RATE_LIMIT_* settings, or None when disabled."""
+    if not RATE_LIMIT_ENABLED:
+        return None
+    if RATE_LIMIT_BACKEND == "memory":
+        backend = MemoryBackend()
+    elif RATE_LIMIT_BACKEND == "shared":
+        path = RATE_LIMIT_SHARED_PATH or os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "fastapi-rate-limit"
+        )
+        backend = SharedMemoryBackend(path, RATE_LIMIT_SHARED_SLOTS)
+    else:
+        raise ValueError(f"RATE_LIMIT_BACKEND must be 'memory' or 'shared', got {RATE_LIMIT_BACKEND!r}")
+    return RateLimiter(parse_rule(RATE_LIMIT_DEFAULT), parse_rules(RATE_LIMIT_RULES), backend)
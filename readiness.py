@@ -0,0 +1,138 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.cache import SingleFlight
+from utils.config_loader import (
+    MONGO_ENABLED,
+    MYSQL_ENABLED,
+    READINESS_CACHE_SECONDS,
+    READINESS_PROBE_TIMEOUT_SECONDS,
+    READINESS_POOL_SATURATION,
+)
+
+
+Probe = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class ProbeDegraded(Exception):
+    """Raised by a probe that works but is close to its limits."""
+
+    def __init__(self, message: str, details: Dict[str, Any]):
+        super().__init__(message)
+        self.details = details
+
+
+async def mongo_probe() -> Dict[str, Any]:
+    from database.mongo import mongo_db_instance
+
+    if mongo_db_instance.client is None:
+        raise ConnectionError("MongoDB client not connected")
+    await mongo_db_instance.client.admin.command("ping")
+    return {"heartbeat_healthy": mongo_db_instance.healthy}
+
+
+async def mysql_probe() -> Dict[str, Any]:
+    from sqlalchemy import text
+    from database.mysql_main_db import get_engine, get_pool_stats
+
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    pools = get_pool_stats()
+    saturated = [name for name, stats in pools.items() if stats["utilization"] >= READINESS_POOL_SATURATION]
+    details = {"pools": pools}
+    if saturated:
+        raise ProbeDegraded(f"Connection pool saturated: {', '.join(saturated)}", details)
+    return details
+
+
+class ReadinessChecker:
+    """
+    Runs the dependency probes concurrently, each under its own timeout, and
+    caches the combined result for `cache_seconds`. However often load
+    balancers ask, the databases see at most one probe per window per
+    worker, and concurrent callers share a single run.
+
+    A probe returns a dict of details when healthy, raises ProbeDegraded when
+    it works but is close to its limits (reported, still ready) and raises
+    anything else when the dependency is unusable (not ready).
+    """
+
+    def __init__(
+        self,
+        probes: Optional[Dict[str, Probe]] = None,
+        timeout: float = READINESS_PROBE_TIMEOUT_SECONDS,
+        cache_seconds: float = READINESS_CACHE_SECONDS
+    ):
+        self.probes = probes if probes is not None else default_probes()
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._single_flight = SingleFlight()
+
+    async def _run_probe(self, probe: Probe) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(probe(), timeout=self.timeout)
+            result = {"status": "ok", **details}
+        except ProbeDegraded as ex:
+            result = {"status": "degraded", "error": str(ex), **ex.details}
+        except asyncio.TimeoutError:
+            result = {"status": "timeout", "error": f"No answer within {self.timeout}s"}
+        except Exception as ex:
+            result = {"status": "down", "error": str(ex)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    async def _check_now(self) -> Dict[str, Any]:
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._run_probe(self.probes[name]) for name in names))
+        checks = dict(zip(names, results))
+        statuses = {check["status"] for check in checks.values()}
+        if statuses & {"down", "timeout"}:
+            status = "not_ready"
+        elif "degraded" in statuses:
+            status = "degraded"
+        else:
+            status = "ready"
+        self._result = {
+            "status": status,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "checks": checks,
+        }
+        self._checked_at = time.monotonic()
+        return self._result
+
+    async def check(self) -> Dict[str, Any]:
+        """Cached result if fresh, otherwise a new run (shared by concurrent callers)."""
+        age = time.monotonic() - self._checked_at
+        if self._result is not None and age < self.cache_seconds:
+            return dict(self._result, cached=True, age_ms=round(age * 1000, 1))
+        result = await self._single_flight.do("readiness", self._check_now)
+        return dict(result, cached=False, age_ms=0.0)
+
+
+def public_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `result` without probe errors and details (driver messages, hostnames,
+    pool stats): only the overall and per-probe status, for the
+    unauthenticated /ready.
+    """
+    public = {key: value for key, value in result.items() if key != "checks"}
+    public["checks"] = {name: {"status": check["status"]} for name, check in result["checks"].items()}
+    return public
+
+
+def default_probes() -> Dict[str, Probe]:
+    """A probe for every backend enabled in the configuration."""
+    probes = {}
+    if MONGO_ENABLED:
+        probes["mongo"] = mongo_probe
+    if MYSQL_ENABLED:
+        probes["mysql"] = mysql_probe
+    return probes
+
+
+readiness_checker = ReadinessChecker()
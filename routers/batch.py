@@ -0,0 +1,160 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.types import Message, Scope
+
+from middleware import BATCH_IDENTITY_SCOPE_KEY
+from utils.responses import FastJSONResponse, dumps, loads
+from utils.config_loader import BATCH_MAX_REQUESTS, BATCH_CONCURRENCY
+
+
+router = APIRouter()
+
+BATCH_PATH = "/batch"
+
+# Parent headers that describe the batch request itself rather than each
+# sub-request. The API key header is kept: it is not checked again, but the
+# response cache varies on it.
+_SKIP_HEADERS = frozenset({b"content-length", b"content-type", b"transfer-encoding", b"accept-encoding", b"accept"})
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest] = Field(..., min_length=1, max_length=BATCH_MAX_REQUESTS)
+    stream: bool = False  # NDJSON, one line per sub-request as soon as it completes
+
+
+def _sub_scope(parent: Scope, sub: SubRequest) -> Scope:
+    url = urlsplit(sub.path)
+    headers = [(name, value) for name, value in parent["headers"] if name not in _SKIP_HEADERS]
+    overrides = {name.lower().encode("latin-1"): value.encode("latin-1") for name, value in sub.headers.items()}
+    headers = [(name, value) for name, value in headers if name not in overrides] + list(overrides.items())
+    scope = {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": sub.method.upper(),
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": url.path,
+        "raw_path": url.path.encode("utf-8"),
+        "query_string": url.query.encode("latin-1"),
+        "headers": headers,
+    }
+    identity = parent.get("state", {}).get("api_key")
+    if identity is not None:
+        scope[BATCH_IDENTITY_SCOPE_KEY] = identity
+    return scope
+
+
+async def _dispatch(app, parent: Scope, index: int, sub: SubRequest) -> Dict[str, Any]:
+    """Run one sub-request through the whole app (middleware included) and collect its response."""
+    result = {"index": index, "id": sub.id}
+    if not sub.path.startswith("/") or urlsplit(sub.path).path == BATCH_PATH:
+        return dict(result, status=400, headers={}, body={"detail": "Sub-request paths must be absolute and not /batch"})
+
+    try:
+        scope = _sub_scope(parent, sub)
+    except (UnicodeEncodeError, ValueError):
+        return dict(result, status=400, headers={}, body={"detail": "Sub-request headers and query must be latin-1"})
+    body = b""
+    if sub.body is not None:
+        body = dumps(sub.body)
+        scope["headers"] = [h for h in scope["headers"] if h[0] != b"content-type"] + [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+
+    response_done = asyncio.Event()
+    request_sent = False
+    response_started = False
+    status = 500
+    headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message):
+        nonlocal status, response_started
+        if message["type"] == "http.response.start":
+            response_started = True
+            status = message["status"]
+            headers.update((name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception as ex:
+        # ServerErrorMiddleware re-raises after sending its 500; one failing
+        # sub-request must not take the rest of the batch down with it
+        if not response_started:
+            print(f"Batch sub-request {sub.method} {sub.path} failed: {ex}")
+            return dict(result, status=500, headers={}, body={"detail": "Internal Server Error"})
+    finally:
+        response_done.set()
+
+    content = b"".join(chunks)
+    content_type = headers.get("content-type", "")
+    payload = content.decode("utf-8", errors="replace")
+    if content_type.startswith("application/json") and content:
+        try:
+            payload = loads(content)
+        except ValueError:
+            pass
+    headers.pop("content-length", None)
+    return dict(result, status=status, headers=headers, body=payload)
+
+
+@router.post(BATCH_PATH)
+async def batch(body: BatchRequest, request: Request):
+    """
+    Run several API calls in one round trip. Each sub-request goes through
+    the full middleware stack in-process (so it is rate limited and recorded
+    by monitoring under its own route) without a new connection or a second
+    API key check, at most BATCH_CONCURRENCY at a time. Responses come back
+    in request order, or as NDJSON in completion order with "stream": true.
+    """
+    app = request.scope["app"]
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def limited(index: int, sub: SubRequest) -> Dict[str, Any]:
+        async with semaphore:
+            return await _dispatch(app, request.scope, index, sub)
+
+    tasks = [asyncio.ensure_future(limited(index, sub)) for index, sub in enumerate(body.requests)]
+
+    if not body.stream:
+        return FastJSONResponse({"responses": await asyncio.gather(*tasks)})
+
+    async def stream_results():
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield dumps(await completed) + b"\n"
+        finally:
+            # Client went away: stop sub-requests that have not finished
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+
+from readiness import public_result, readiness_checker
+from utils.responses import FastJSONResponse
+
+
+router = APIRouter()
+
+
+def _status_code(result) -> int:
+    return 503 if result["status"] == "not_ready" else 200
+
+
+@router.get("/ready")
+async def read_readiness():
+    """
+    Readiness: probes every enabled database (cached for a few seconds) and
+    answers 503 when one is unusable. Liveness stays on /health-check.
+    Unauthenticated, so only statuses are shown; see /ready/details.
+    """
+    result = await readiness_checker.check()
+    return FastJSONResponse(status_code=_status_code(result), content=public_result(result))
+
+
+@router.get("/ready/details")
+async def read_readiness_details():
+    """Same check as /ready with probe errors, latencies and pool stats (requires an API key)."""
+    result = await readiness_checker.check()
+    return FastJSONResponse(status_code=_status_code(result), content=result)
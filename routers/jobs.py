@@ -0,0 +1,47 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from services.jobs import QueueFull, job_engine
+from utils.responses import FastJSONResponse
+
+
+router = APIRouter()
+
+
+class JobRequest(BaseModel):
+    name: str
+    params: Dict[str, Any] = {}
+    priority: int = Field(0, ge=-10, le=10)
+
+
+def _owner(request: Request):
+    identity = getattr(request.state, "api_key", None)
+    return identity.key_id if identity is not None else None
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(body: JobRequest, request: Request):
+    """Queue a background job and return at once; poll Location for the result."""
+    try:
+        job = await job_engine.submit(body.name, body.params, body.priority, owner=_owner(request))
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    except QueueFull as ex:
+        raise HTTPException(status_code=503, detail=str(ex), headers={"Retry-After": "5"})
+    return FastJSONResponse(
+        status_code=202,
+        content={"id": job["id"], "status": job["status"], "queue": job["queue"]},
+        headers={"Location": f"/jobs/{job['id']}"},
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def read_job(job_id: str, request: Request):
+    """Status of a job, with its result or error once finished. Only visible to the key that submitted it."""
+    job = await job_engine.get(job_id)
+    if job is None or job.get("owner") != _owner(request):
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("owner", None)
+    return job
@@ -0,0 +1,21 @@
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from metrics import metrics_registry, render_host_metrics, render_metrics
+from utils.config_loader import METRICS_MULTIPROC_DIR
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Per-route request counts, error counts and latency histograms in Prometheus text format."""
+    if METRICS_MULTIPROC_DIR:
+        # Snapshot on the loop (collectors read live state), merge the workers' files in a thread
+        body = await asyncio.to_thread(render_host_metrics, METRICS_MULTIPROC_DIR, metrics_registry.snapshot())
+    else:
+        body = render_metrics()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
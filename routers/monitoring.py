@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api_keys import require_scopes
+from monitoring_rollups import rollup_scheduler
+
+
+router = APIRouter(prefix="/monitoring", dependencies=[Depends(require_scopes("monitoring:read"))])
+
+# Longest window served at minute resolution; longer ones use hourly rollups
+MAX_MINUTE_WINDOW = 24 * 60
+
+
+def _window(minutes: int, granularity: Optional[str]):
+    if rollup_scheduler.handler is None:
+        raise HTTPException(status_code=503, detail="Monitoring storage is disabled (MONITORING_BACKEND=none)")
+    if granularity is None:
+        granularity = "minute" if minutes <= 6 * 60 else "hour"
+    if granularity == "minute" and minutes > MAX_MINUTE_WINDOW:
+        raise HTTPException(status_code=400, detail=f"Minute granularity covers at most {MAX_MINUTE_WINDOW} minutes")
+    # Rollups cover complete minutes only
+    end = datetime.utcnow().replace(second=0, microsecond=0)
+    start = end - timedelta(minutes=minutes)
+    if granularity == "hour":
+        start = start.replace(minute=0)
+    return start, end, granularity
+
+
+@router.get("/summary")
+async def read_summary(
+    minutes: int = Query(60, ge=1, le=400 * 24 * 60),
+    granularity: Optional[Literal["minute", "hour"]] = None,
+    route: Optional[str] = None,
+    method: Optional[str] = None
+):
+    """Per-route request count, throughput, error rate and p50/p95/p99 latency (ms) over the last `minutes`."""
+    start, end, granularity = _window(minutes, granularity)
+    routes = await rollup_scheduler.summary(start, end, granularity, route=route, method=method)
+    return {"start": start, "end": end, "granularity": granularity, "routes": routes}
+
+
+@router.get("/timeseries")
+async def read_timeseries(
+    minutes: int = Query(60, ge=1, le=400 * 24 * 60),
+    granularity: Optional[Literal["minute", "hour"]] = None,
+    route: Optional[str] = None,
+    method: Optional[str] = None
+):
+    """The same statistics per minute or hour bucket, for one route or all of them together."""
+    start, end, granularity = _window(minutes, granularity)
+    points = await rollup_scheduler.timeseries(start, end, granularity, route=route, method=method)
+    return {"start": start, "end": end, "granularity": granularity, "route": route, "method": method, "points": points}
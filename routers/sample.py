@@ -1,5 +1,14 @@
 from fastapi import APIRouter
 
+from utils.response_cache import cached
 
 
-router = APIRouter()
\ No newline at end of file
+
+router = APIRouter()
+
+
+@router.get("/sample/cached")
+@cached(ttl=30)
+async def cached_sample(name: str = "world"):
+    """Example of a cached GET endpoint: repeat calls within 30s are served from the response cache."""
+    return {"message": f"Hello, {name}!"}
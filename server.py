@@ -0,0 +1,85 @@
+"""
+Production launcher:
+
+    python server.py
+
+Runs main:app under uvicorn with one worker per available CPU (or
+SERVER_WORKERS), uvloop and httptools when installed, a larger listen
+backlog and a keep-alive timeout above the load balancer's idle timeout.
+
+On SIGTERM/SIGINT uvicorn stops accepting connections, waits up to
+SERVER_GRACEFUL_SHUTDOWN_SECONDS for in-flight requests, then runs the
+lifespan shutdown in every worker, which flushes the monitoring writers and
+drains the log queue before the database clients close.
+
+With more than one worker each process writes metric snapshots to a shared
+directory (METRICS_MULTIPROC_DIR, a temporary one unless set) so /metrics on
+any worker reports the whole host; see metrics.render_host_metrics.
+"""
+import importlib.util
+import os
+import shutil
+import tempfile
+
+from utils.config_loader import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_BACKLOG,
+    SERVER_KEEPALIVE_SECONDS,
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+    SERVER_PROXY_HEADERS,
+    SERVER_FORWARDED_ALLOW_IPS,
+)
+
+
+def worker_count() -> int:
+    if SERVER_WORKERS > 0:
+        return SERVER_WORKERS
+    try:
+        # CPUs this process may run on (respects taskset/cpusets), not all of the host's
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    import uvicorn
+
+    workers = worker_count()
+    multiproc_dir = None
+    if workers > 1 and not os.getenv("METRICS_MULTIPROC_DIR"):
+        # Inherited by the worker processes, read by utils.config_loader there
+        multiproc_dir = tempfile.mkdtemp(prefix="api-metrics-")
+        os.environ["METRICS_MULTIPROC_DIR"] = multiproc_dir
+
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    print(f"Starting {workers} worker(s) on {SERVER_HOST}:{SERVER_PORT} (loop={loop}, http={http})")
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host=SERVER_HOST,
+            port=SERVER_PORT,
+            workers=workers,
+            loop=loop,
+            http=http,
+            backlog=SERVER_BACKLOG,
+            timeout_keep_alive=SERVER_KEEPALIVE_SECONDS,
+            timeout_graceful_shutdown=SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+            proxy_headers=SERVER_PROXY_HEADERS,
+            forwarded_allow_ips=SERVER_FORWARDED_ALLOW_IPS,
+            access_log=False,  # MonitoringMiddleware already records every request
+        )
+    finally:
+        if multiproc_dir is not None:
+            shutil.rmtree(multiproc_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
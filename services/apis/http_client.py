@@ -0,0 +1,291 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from metrics import metrics_registry
+from utils.config_loader import (
+    HTTP_CLIENT_TIMEOUT_SECONDS,
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+    HTTP_CLIENT_MAX_CONNECTIONS,
+    HTTP_CLIENT_MAX_KEEPALIVE,
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_CLIENT_PER_HOST_LIMIT,
+    HTTP_CLIENT_RETRIES,
+    HTTP_CLIENT_BACKOFF_BASE_SECONDS,
+    HTTP_CLIENT_BACKOFF_MAX_SECONDS,
+    HTTP_CLIENT_BREAKER_FAILURES,
+    HTTP_CLIENT_BREAKER_RESET_SECONDS,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+upstream_requests_total = metrics_registry.counter(
+    "upstream_requests_total", "Outbound HTTP requests (one per attempt)", ("host", "method", "status")
+)
+upstream_request_duration_seconds = metrics_registry.histogram(
+    "upstream_request_duration_seconds", "Outbound HTTP request latency in seconds", ("host", "method", "status")
+)
+upstream_retries_total = metrics_registry.counter(
+    "upstream_retries_total", "Outbound HTTP requests retried", ("host",)
+)
+upstream_rejected_total = metrics_registry.counter(
+    "upstream_circuit_rejected_total", "Outbound HTTP requests rejected by an open circuit", ("host",)
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit open for {host}; retry in {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker. After `failure_threshold` consecutive failures the
+    circuit opens and calls fail fast for `reset_timeout` seconds; then a
+    single trial call is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+
+    before_call() returns a (generation, trial) ticket to hand back to
+    record_success()/record_failure()/release(). The generation changes with
+    every state change, so outcomes of calls started before it (e.g. a slow
+    call sent before the outage) are ignored instead of deciding the state.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.generation = 0
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            self.generation += 1
+
+    def before_call(self, host: str) -> Tuple[int, bool]:
+        if self.state == self.CLOSED:
+            return self.generation, False
+        elapsed = time.monotonic() - self.opened_at
+        if self.state == self.OPEN and elapsed >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return self.generation, True
+        raise CircuitOpenError(host, max(self.reset_timeout - elapsed, 0.0))
+
+    def release(self, ticket: Tuple[int, bool]):
+        """End a call without an outcome (e.g. cancelled): if it was the trial, a later call may be one."""
+        generation, trial = ticket
+        if trial and generation == self.generation:
+            self._trial_in_flight = False
+
+    def record_success(self, ticket: Tuple[int, bool]):
+        if ticket[0] != self.generation:
+            return
+        self._set_state(self.CLOSED)
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, ticket: Tuple[int, bool]):
+        if ticket[0] != self.generation:
+            return
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._set_state(self.OPEN)
+            self.opened_at = time.monotonic()
+
+
+class HTTPClientService:
+    """
+    Shared async HTTP client for calls to upstream APIs.
+
+    One httpx.AsyncClient keeps connections alive across requests, so calls
+    reuse pooled TCP/TLS connections instead of handshaking every time. On
+    top of it this adds a per-host concurrency limit, retries with jittered
+    exponential backoff for idempotent requests, a per-host circuit breaker
+    and latency metrics on /metrics.
+
+    The client is created on first use and closed by close() in the
+    lifespan shutdown. Pass `transport` (e.g. httpx.MockTransport) to run
+    without network access.
+    """
+
+    def __init__(
+        self,
+        timeout: float = HTTP_CLIENT_TIMEOUT_SECONDS,
+        connect_timeout: float = HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+        max_connections: int = HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_CLIENT_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+        per_host_limit: int = HTTP_CLIENT_PER_HOST_LIMIT,
+        retries: int = HTTP_CLIENT_RETRIES,
+        backoff_base: float = HTTP_CLIENT_BACKOFF_BASE_SECONDS,
+        backoff_max: float = HTTP_CLIENT_BACKOFF_MAX_SECONDS,
+        breaker_failures: int = HTTP_CLIENT_BREAKER_FAILURES,
+        breaker_reset: float = HTTP_CLIENT_BREAKER_RESET_SECONDS,
+        retry_statuses: Sequence[int] = RETRY_STATUSES,
+        transport: Optional["httpx.AsyncBaseTransport"] = None
+    ):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.retry_statuses = frozenset(retry_statuses)
+        self.transport = transport
+
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx  # Imported on first use to keep startup fast
+
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limit
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+        return breaker
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries from many callers instead of syncing them up
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        retries: Optional[int] = None,
+        retry_non_idempotent: bool = False,
+        **kwargs
+    ) -> "httpx.Response":
+        """
+        Send a request through the shared client. Extra keyword arguments go
+        to httpx.AsyncClient.request (params, json, headers, timeout, ...).
+
+        Raises CircuitOpenError when the host's circuit is open, or the last
+        httpx.TransportError once retries are exhausted. A response with a
+        retryable status is returned as-is after the final attempt.
+        """
+        import httpx
+
+        method = method.upper()
+        client = self.client
+        host = httpx.URL(url).host or client.base_url.host
+        breaker = self.breaker(host)
+        attempts = 1 + (retries if retries is not None else self.retries)
+        if method not in IDEMPOTENT_METHODS and not retry_non_idempotent:
+            attempts = 1
+
+        for attempt in range(attempts):
+            try:
+                ticket = breaker.before_call(host)
+            except CircuitOpenError:
+                upstream_rejected_total.inc((host,))
+                raise
+
+            status = "error"
+            start = time.perf_counter()
+            try:
+                async with self._host_limit(host):
+                    response = await client.request(method, url, **kwargs)
+                status = str(response.status_code)
+            except httpx.TransportError:
+                breaker.record_failure(ticket)
+                if attempt + 1 >= attempts:
+                    raise
+            except Exception:
+                # Not retried (invalid URL, decoding error, ...), but still a failed call
+                breaker.record_failure(ticket)
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure(ticket)
+                else:
+                    breaker.record_success(ticket)
+                if response.status_code not in self.retry_statuses or attempt + 1 >= attempts:
+                    return response
+                await response.aclose()
+            finally:
+                # Cancellation is neutral, but must not leave a half-open trial in flight forever
+                breaker.release(ticket)
+                labels = (host, method, status)
+                upstream_requests_total.inc(labels)
+                upstream_request_duration_seconds.observe(labels, time.perf_counter() - start)
+
+            upstream_retries_total.inc((host,))
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("DELETE", url, **kwargs)
+
+
+http_client = HTTPClientService()
+
+
+def get_http_client() -> HTTPClientService:
+    """FastAPI dependency / accessor for the shared client."""
+    return http_client
+
+
+async def close_http_client():
+    """Close pooled connections. Called from the lifespan shutdown."""
+    await http_client.close()
@@ -0,0 +1,335 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from metrics import CounterFamily, GaugeFamily, metrics_registry
+from utils.cache import TTLCache
+from utils.config_loader import (
+    JOB_STORE_BACKEND,
+    JOB_DB_NAME,
+    JOB_QUEUES,
+    JOB_MAX_PENDING,
+    JOB_PROCESS_WORKERS,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_SHUTDOWN_GRACE_SECONDS,
+)
+
+
+FINISHED_STATUSES = frozenset({"succeeded", "failed", "cancelled"})
+
+
+def parse_queues(spec: str) -> Dict[str, int]:
+    """Parse "default=8,cpu=2" into queue name -> concurrent jobs."""
+    queues = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, concurrency = item.partition("=")
+        queues[name.strip()] = max(int(concurrency or 1), 1)
+    return queues
+
+
+class QueueFull(Exception):
+    """Raised by submit() when JOB_MAX_PENDING jobs are already waiting."""
+
+
+class JobStore:
+    """
+    Where job records live. A record is a plain dict (id, name, queue,
+    status, params, result, error, timestamps), so backends only need to
+    store, patch and return it.
+    """
+
+    async def create(self, job: Dict[str, Any]):
+        raise NotImplementedError()
+
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        raise NotImplementedError()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError()
+
+
+class InMemoryJobStore(JobStore):
+    """Per-process store for development and tests; records expire after JOB_RESULT_TTL_SECONDS."""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = JOB_RESULT_TTL_SECONDS):
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    async def create(self, job: Dict[str, Any]):
+        self.cache.set(job["id"], dict(job))
+
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        job = self.cache.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.cache.get(job_id)
+        return dict(job) if job is not None else None
+
+
+class MongoJobStore(JobStore):
+    """
+    Records in a MongoDB collection, so any worker can answer a status
+    request. Finished jobs get an expires_at and are removed by a TTL index.
+    """
+
+    def __init__(self, db_name: str, collection_name: str = "jobs", ttl: float = JOB_RESULT_TTL_SECONDS):
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self._indexed = False
+
+    async def _collection(self):
+        from database.mongo import get_collection
+
+        collection = await get_collection(self.db_name, self.collection_name)
+        if not self._indexed:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    async def create(self, job: Dict[str, Any]):
+        collection = await self._collection()
+        await collection.insert_one(dict(job, _id=job["id"]))
+
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        if fields.get("status") in FINISHED_STATUSES:
+            fields = dict(fields, expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl))
+        collection = await self._collection()
+        await collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        collection = await self._collection()
+        return await collection.find_one({"_id": job_id}, {"_id": 0, "expires_at": 0})
+
+
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    queue: str
+    cpu: bool
+    timeout: Optional[float]
+
+
+class JobEngine:
+    """
+    Runs work submitted by request handlers outside the request.
+
+    Every queue has a priority queue (higher priority first, then FIFO) and
+    its own number of worker tasks, which is its concurrency limit, so a
+    burst of slow reports cannot starve short jobs on another queue. Async
+    jobs run on the event loop; jobs registered with cpu=True are sync
+    functions run in a ProcessPoolExecutor, so parsing or number crunching
+    never holds the loop (or the GIL) of the worker serving requests.
+
+    Register handlers with the task() decorator. A handler takes the job's
+    params dict and returns something JSON-serialisable. CPU handlers must
+    be module-level functions so the pool can pickle them by name.
+
+    Pending jobs are bounded by max_pending (QueueFull past it). Queued jobs
+    live in this process: on shutdown running jobs get `shutdown_grace`
+    seconds to finish and whatever has not started is marked cancelled.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        queues: Optional[Dict[str, int]] = None,
+        max_pending: int = JOB_MAX_PENDING,
+        process_workers: int = JOB_PROCESS_WORKERS,
+        shutdown_grace: float = JOB_SHUTDOWN_GRACE_SECONDS
+    ):
+        self.store = store or InMemoryJobStore()
+        self.concurrency = queues or parse_queues(JOB_QUEUES)
+        self.max_pending = max_pending
+        self.process_workers = process_workers
+        self.shutdown_grace = shutdown_grace
+        self.job_types: Dict[str, JobType] = {}
+        self.stats = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+        self._queues = {name: asyncio.PriorityQueue() for name in self.concurrency}
+        self._running = {name: 0 for name in self.concurrency}
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._accepting = False
+
+    def task(self, name: str, queue: str = "default", cpu: bool = False, timeout: Optional[float] = None):
+        """
+        Register a job handler:
+
+            @job_engine.task("reports.build", queue="reports", cpu=True, timeout=300)
+            def build_report(params): ...
+        """
+        if queue not in self.concurrency:
+            raise ValueError(f"Unknown job queue {queue!r}; configure it in JOB_QUEUES")
+
+        def decorator(fn):
+            if cpu == asyncio.iscoroutinefunction(fn):
+                raise TypeError(f"Job {name!r}: cpu jobs must be sync functions, other jobs async ones")
+            self.job_types[name] = JobType(name, fn, queue, cpu, timeout)
+            return fn
+
+        return decorator
+
+    @property
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def submit(self, name: str, params: Optional[Dict[str, Any]] = None, priority: int = 0,
+                     owner: Optional[str] = None) -> Dict[str, Any]:
+        """Store a queued job and return its record; raises ValueError for unknown names."""
+        job_type = self.job_types.get(name)
+        if job_type is None:
+            raise ValueError(f"Unknown job {name!r}")
+        if not self._accepting:
+            raise QueueFull("The job engine is not running")
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise QueueFull(f"{self.pending} jobs already pending")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "name": name,
+            "queue": job_type.queue,
+            "priority": priority,
+            "owner": owner,
+            "status": "queued",
+            "params": params or {},
+            "result": None,
+            "error": None,
+            "created_at": datetime.now(timezone.utc),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.store.create(job)
+        self._queues[job_type.queue].put_nowait((-priority, next(self._sequence), job["id"], job_type, job["params"]))
+        self.stats["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get(job_id)
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and helper threads is not safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.process_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def _finish(self, job_id: str, status: str, start: float, **fields):
+        self.stats[status] += 1
+        fields.update(
+            status=status,
+            finished_at=datetime.now(timezone.utc),
+            duration_ms=round((time.perf_counter() - start) * 1000, 2),
+        )
+        try:
+            await self.store.update(job_id, fields)
+        except Exception as ex:
+            print(f"Failed to store the result of job {job_id}: {ex}")
+
+    async def _run(self, job_id: str, job_type: JobType, params: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            await self.store.update(job_id, {"status": "running", "started_at": datetime.now(timezone.utc)})
+            if job_type.cpu:
+                call = asyncio.get_running_loop().run_in_executor(self._process_pool(), job_type.fn, params)
+            else:
+                call = job_type.fn(params)
+            # A timed-out cpu job still finishes in its pool process; only the wait is abandoned
+            result = await asyncio.wait_for(call, job_type.timeout)
+        except asyncio.CancelledError:
+            # Shielded: this task is being cancelled, the status update must still land
+            await asyncio.shield(self._finish(job_id, "cancelled", start, error="Cancelled at shutdown"))
+            raise
+        except asyncio.TimeoutError:
+            await self._finish(job_id, "failed", start, error=f"Timed out after {job_type.timeout}s")
+        except Exception as ex:
+            await self._finish(job_id, "failed", start, error=f"{type(ex).__name__}: {ex}")
+        else:
+            await self._finish(job_id, "succeeded", start, result=jsonable_encoder(result))
+
+    async def _worker(self, queue_name: str):
+        queue = self._queues[queue_name]
+        while True:
+            _, _, job_id, job_type, params = await queue.get()
+            if job_id is None:
+                return  # Shutdown sentinel, sorted after every real job
+            self._running[queue_name] += 1
+            try:
+                await self._run(job_id, job_type, params)
+            finally:
+                self._running[queue_name] -= 1
+
+    def start(self):
+        if self._workers:
+            return
+        self._accepting = True
+        for name, concurrency in self.concurrency.items():
+            for _ in range(concurrency):
+                self._workers.append(asyncio.create_task(self._worker(name)))
+
+    async def stop(self):
+        """Cancel queued jobs, give running ones shutdown_grace seconds, then cancel the rest."""
+        if not self._workers:
+            return
+        self._accepting = False
+        now = time.perf_counter()
+        for name, queue in self._queues.items():
+            while not queue.empty():
+                _, _, job_id, _, _ = queue.get_nowait()
+                await self._finish(job_id, "cancelled", now, error="Server shut down before the job started")
+            for _ in range(self.concurrency[name]):
+                queue.put_nowait((float("inf"), next(self._sequence), None, None, None))
+
+        _, still_running = await asyncio.wait(self._workers, timeout=self.shutdown_grace)
+        for worker in still_running:
+            worker.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def build_job_store(backend: str = JOB_STORE_BACKEND) -> JobStore:
+    """Store named by JOB_STORE_BACKEND: "memory" (per process) or "mongo" (shared)."""
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "mongo":
+        return MongoJobStore(JOB_DB_NAME)
+    raise ValueError(f"JOB_STORE_BACKEND must be 'memory' or 'mongo', got {backend!r}")
+
+
+job_engine = JobEngine(store=build_job_store())
+
+
+def _job_metrics() -> List[str]:
+    queued = GaugeFamily("jobs_queued", "Background jobs waiting to start", ("queue",))
+    running = GaugeFamily("jobs_running", "Background jobs running", ("queue",))
+    for name, queue in job_engine._queues.items():
+        queued.set((name,), queue.qsize())
+        running.set((name,), job_engine._running[name])
+    submitted = CounterFamily("jobs_submitted_total", "Background jobs accepted or rejected (queue full)", ("outcome",))
+    finished = CounterFamily("jobs_finished_total", "Background jobs by final status", ("status",))
+    for outcome in ("submitted", "rejected"):
+        submitted.inc((outcome,), job_engine.stats[outcome])
+    for status in FINISHED_STATUSES:
+        finished.inc((status,), job_engine.stats[status])
+    return queued.render() + running.render() + submitted.render() + finished.render()
+
+
+metrics_registry.register_collector(_job_metrics)
+
@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from utils.cache import TTLCache
+from utils.config_loader import (
+    OPENAI_API_KEY,
+    LLM_MODEL,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_MAX_CONCURRENCY,
+    LLM_PER_KEY_CONCURRENCY,
+)
+
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI Assistant"
+
+
+class BaseLLMProvider:
+    """
+    What LLMService needs from a provider. Implement generate(); stream()
+    defaults to yielding the whole answer as one chunk. Tests can pass a
+    small fake subclass instead of a real provider.
+    """
+
+    async def generate(self, prompt: str, *, model: str, system_prompt: str,
+                       temperature: float, max_tokens: int) -> str:
+        raise NotImplementedError()
+
+    async def stream(self, prompt: str, *, model: str, system_prompt: str,
+                     temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        yield await self.generate(
+            prompt, model=model, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens
+        )
+
+
+class LLMProviderError(Exception):
+    """The provider call failed or came back without an answer."""
+
+
+class SimplerLLMProvider(BaseLLMProvider):
+    """
+    OpenAI through the OpenAI SDK (installed with SimplerLLM). One
+    AsyncOpenAI client, created on first use, serves complete answers and
+    token streams alike, so both reuse its pooled connections.
+    """
+
+    def __init__(self, api_key: Optional[str] = OPENAI_API_KEY):
+        self.api_key = api_key
+        self._openai = None
+
+    def _client(self):
+        if self._openai is None:
+            from openai import AsyncOpenAI
+
+            self._openai = AsyncOpenAI(api_key=self.api_key)
+        return self._openai
+
+    @staticmethod
+    def _messages(prompt: str, system_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
+    async def generate(self, prompt: str, *, model: str, system_prompt: str,
+                       temperature: float, max_tokens: int) -> str:
+        response = await self._client().chat.completions.create(
+            model=model,
+            messages=self._messages(prompt, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        content = response.choices[0].message.content if response.choices else None
+        if content is None:
+            raise LLMProviderError(f"{model} returned no answer")
+        return content
+
+    async def stream(self, prompt: str, *, model: str, system_prompt: str,
+                     temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        response = await self._client().chat.completions.create(
+            model=model,
+            messages=self._messages(prompt, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        async for event in response:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+
+
+class _SharedCall:
+    """
+    One provider call whose chunks are replayed to every caller that asked
+    for the same prompt while it was running.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    async def push(self, chunk: str):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done or len(self.chunks) > index)
+
+
+class LLMService:
+    """
+    Wrapper every LLM-backed endpoint should go through.
+
+    - Exact-match cache: answers are cached (LRU + TTL) under a hash of the
+      model, prompt and generation parameters.
+    - Single flight: identical prompts arriving while a call is running join
+      that call, streaming or not, so the provider sees it once.
+    - Concurrency limits: a global cap on provider calls plus a cap per
+      caller key (e.g. the API key), so one client cannot take every slot.
+      A shared call holds a slot of the caller key that started it only;
+      callers joining it use none of their own, since they cost no extra
+      provider call.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[BaseLLMProvider] = None,
+        model: str = LLM_MODEL,
+        cache_ttl: float = LLM_CACHE_TTL_SECONDS,
+        cache_size: int = LLM_CACHE_MAX_ENTRIES,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        per_key_concurrency: int = LLM_PER_KEY_CONCURRENCY
+    ):
+        self.provider = provider or SimplerLLMProvider()
+        self.model = model
+        self.cache = TTLCache(max_entries=cache_size, ttl=cache_ttl)
+        self.per_key_concurrency = per_key_concurrency
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._key_limits: Dict[str, list] = {}  # caller key -> [semaphore, holders + waiters]
+        self._in_flight: Dict[str, _SharedCall] = {}
+        self.stats = {"provider_calls": 0, "coalesced": 0}
+
+    @staticmethod
+    def cache_key(model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+        payload = json.dumps([model, system_prompt, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _leave_key_limit(self, caller_key: str, entry: list):
+        entry[1] -= 1
+        # Drop idle per-key semaphores so the dict does not grow forever
+        if entry[1] == 0:
+            self._key_limits.pop(caller_key, None)
+
+    @asynccontextmanager
+    async def _limit(self, caller_key: Optional[str]):
+        entry = None
+        if caller_key is not None:
+            entry = self._key_limits.get(caller_key)
+            if entry is None:
+                entry = self._key_limits[caller_key] = [asyncio.Semaphore(self.per_key_concurrency), 0]
+            entry[1] += 1  # holders and waiters
+            try:
+                await entry[0].acquire()
+            except BaseException:
+                self._leave_key_limit(caller_key, entry)
+                raise
+        try:
+            async with self._global_limit:
+                yield
+        finally:
+            if entry is not None:
+                entry[0].release()
+                self._leave_key_limit(caller_key, entry)
+
+    async def _run(self, key: str, call: _SharedCall, params: dict, streaming: bool, caller_key: Optional[str]):
+        try:
+            async with self._limit(caller_key):
+                self.stats["provider_calls"] += 1
+                if streaming:
+                    async for chunk in self.provider.stream(**params):
+                        await call.push(chunk)
+                else:
+                    await call.push(await self.provider.generate(**params))
+            self.cache.set(key, "".join(call.chunks))
+            await call.finish()
+        except BaseException as ex:
+            await call.finish(ex)
+            if isinstance(ex, asyncio.CancelledError):
+                raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _shared_call(self, prompt: str, model: Optional[str], system_prompt: str, temperature: float,
+                     max_tokens: int, streaming: bool, caller_key: Optional[str]):
+        model = model or self.model
+        key = self.cache_key(model, prompt, system_prompt, temperature, max_tokens)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return key, cached, None
+
+        call = self._in_flight.get(key)
+        if call is not None:
+            self.stats["coalesced"] += 1
+            return key, None, call
+
+        call = self._in_flight[key] = _SharedCall()
+        params = {
+            "prompt": prompt, "model": model, "system_prompt": system_prompt,
+            "temperature": temperature, "max_tokens": max_tokens,
+        }
+        # Runs as its own task so a caller disconnecting does not cut off the others
+        call.task = asyncio.create_task(self._run(key, call, params, streaming, caller_key))
+        return key, None, call
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        model: Optional[str] = None,
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+        temperature: float = 0.7,
+        max_tokens: int = 300,
+        caller_key: Optional[str] = None
+    ) -> str:
+        """Return the complete answer, from cache or a (possibly shared) provider call."""
+        _, cached, call = self._shared_call(
+            prompt, model, system_prompt, temperature, max_tokens, streaming=False, caller_key=caller_key
+        )
+        if cached is not None:
+            return cached
+        return "".join([chunk async for chunk in call.follow()])
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        model: Optional[str] = None,
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+        temperature: float = 0.7,
+        max_tokens: int = 300,
+        caller_key: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield the answer as the provider produces it; cached answers come as one chunk."""
+        _, cached, call = self._shared_call(
+            prompt, model, system_prompt, temperature, max_tokens, streaming=True, caller_key=caller_key
+        )
+        if cached is not None:
+            yield cached
+            return
+        async for chunk in call.follow():
+            yield chunk
+
+
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_response(chunks: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Stream text chunks to the client as server-sent events. Each chunk is a
+    "data" event; the stream ends with an "event: done" event, or
+    "event: error" if the generator fails part-way.
+    """
+
+    async def events():
+        try:
+            async for chunk in chunks:
+                yield _sse_event(chunk)
+        except Exception as ex:
+            yield _sse_event(str(ex), event="error")
+            return
+        yield _sse_event("[DONE]", event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_llm_service: Optional[LLMService] = None
+
+
+def get_llm_service() -> LLMService:
+    """Shared LLMService (FastAPI dependency); created on first use."""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService()
+    return _llm_service
@@ -0,0 +1,34 @@
+import asyncio
+import hashlib
+from typing import Any, Dict
+
+from services.jobs import JobEngine
+
+
+async def sample_sleep(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Async job: waits params["seconds"] (max 60) without blocking anything."""
+    seconds = min(float(params.get("seconds", 1)), 60.0)
+    await asyncio.sleep(seconds)
+    return {"slept": seconds}
+
+
+def sample_checksum(params: Dict[str, Any]) -> Dict[str, Any]:
+    """CPU job: iterated SHA-256 of params["text"], run in the process pool."""
+    digest = str(params.get("text", "")).encode("utf-8")
+    rounds = min(int(params.get("rounds", 100000)), 10_000_000)
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    return {"rounds": rounds, "sha256": digest.hex()}
+
+
+def register_sample_jobs(engine: JobEngine):
+    """Register the example jobs on the queues they need, skipping those JOB_QUEUES does not configure."""
+    examples = (
+        ("sample.sleep", sample_sleep, "default", False, None),
+        ("sample.checksum", sample_checksum, "cpu", True, 120),
+    )
+    for name, fn, queue, cpu, timeout in examples:
+        if queue not in engine.concurrency:
+            print(f"Skipping example job {name}: no {queue!r} queue in JOB_QUEUES")
+            continue
+        engine.task(name, queue=queue, cpu=cpu, timeout=timeout)(fn)
@@ -0,0 +1,5 @@
+import os
+
+# Settings are read at import time; give the app what it needs to import
+os.environ.setdefault("API_KEY_HEADER_NAME", "X-API-Key")
+os.environ.setdefault("API_KEY_PASSPHRASE", "test-key")
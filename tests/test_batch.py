@@ -0,0 +1,45 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import batch
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(batch.router)
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+REQUESTS = [{"id": "ok", "path": "/ok"}, {"id": "boom", "path": "/boom"}]
+
+
+def test_failing_sub_request_does_not_fail_the_batch():
+    response = _client().post("/batch", json={"requests": REQUESTS})
+    assert response.status_code == 200
+    ok, boom = response.json()["responses"]
+    assert (ok["status"], ok["body"]) == (200, {"ok": True})
+    assert boom["id"] == "boom" and boom["status"] == 500
+
+
+def test_failing_sub_request_does_not_truncate_the_stream():
+    response = _client().post("/batch", json={"requests": REQUESTS, "stream": True})
+    assert response.status_code == 200
+    lines = [batch.loads(line) for line in response.content.splitlines()]
+    assert sorted((line["id"], line["status"]) for line in lines) == [("boom", 500), ("ok", 200)]
+
+
+def test_invalid_sub_request_headers_only_fail_that_sub_request():
+    requests = [{"id": "ok", "path": "/ok"}, {"id": "bad", "path": "/ok", "headers": {"X-Name": "名前"}}]
+    response = _client().post("/batch", json={"requests": requests})
+    assert response.status_code == 200
+    ok, bad = response.json()["responses"]
+    assert ok["status"] == 200 and bad["status"] == 400
@@ -5,6 +5,11 @@ import os
 # Load environment variables from .env file at the start of the application
 load_dotenv(override=True)
 
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 #configuration
 ENVIRONMENT=os.getenv("ENVIRONMENT")
 
@@ -13,16 +18,180 @@ ENVIRONMENT=os.getenv("ENVIRONMENT")
 #API Security
 API_KEY_HEADER_NAME = os.getenv("API_KEY_HEADER_NAME")
 API_KEY_PASSPHRASE = os.getenv("API_KEY_PASSPHRASE")
+API_KEY_PEPPER = os.getenv("API_KEY_PEPPER", "")  # secret mixed into stored key hashes
+API_KEYS_BACKEND = os.getenv("API_KEYS_BACKEND", "none").strip().lower()  # none | mongo | mysql
+API_KEYS_DB_NAME = os.getenv("API_KEYS_DB_NAME", "auth")
+API_KEYS_COLLECTION_NAME = os.getenv("API_KEYS_COLLECTION_NAME", "api_keys")
+API_KEYS_REFRESH_SECONDS = float(os.getenv("API_KEYS_REFRESH_SECONDS", "60"))
 
 #OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+#LLM service (services/llm.py)
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "20"))  # provider calls in flight, all callers
+LLM_PER_KEY_CONCURRENCY = int(os.getenv("LLM_PER_KEY_CONCURRENCY", "4"))  # per API key
+
 
 #Database Connections
 MONGO_CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
 MYSQL_CONNECTION_STRING = os.getenv("MYSQL_CONNECTION_STRING")
 
 
+#Optional backends: nothing is imported or connected unless enabled
+MONGO_ENABLED = _env_flag("MONGO_ENABLED")
+MYSQL_ENABLED = _env_flag("MYSQL_ENABLED")
+FILE_LOGGING_ENABLED = _env_flag("FILE_LOGGING_ENABLED")
+MONGO_LOGGING_ENABLED = _env_flag("MONGO_LOGGING_ENABLED")
+MONGO_LOGGING_DB_NAME = os.getenv("MONGO_LOGGING_DB_NAME", "logs_db")
+
+#API monitoring: in-memory /metrics always; MONITORING_BACKEND also stores each request
+MONITORING_ENABLED = _env_flag("MONITORING_ENABLED", "true")
+MONITORING_BACKEND = os.getenv("MONITORING_BACKEND", "none")  # none | mongo | mysql
+MONITORING_DB_NAME = os.getenv("MONITORING_DB_NAME", "pk_api_monitor")
+MONITORING_COLLECTION_NAME = os.getenv("MONITORING_COLLECTION_NAME", "data")  # table name for mysql
+MONITORING_RAW_RETENTION_DAYS = float(os.getenv("MONITORING_RAW_RETENTION_DAYS", "7"))
+MONITORING_MINUTE_RETENTION_DAYS = float(os.getenv("MONITORING_MINUTE_RETENTION_DAYS", "14"))
+MONITORING_HOUR_RETENTION_DAYS = float(os.getenv("MONITORING_HOUR_RETENTION_DAYS", "400"))
+MONITORING_ROLLUP_INTERVAL_SECONDS = float(os.getenv("MONITORING_ROLLUP_INTERVAL_SECONDS", "60"))
+MONITORING_ROLLUP_LOOKBACK_MINUTES = int(os.getenv("MONITORING_ROLLUP_LOOKBACK_MINUTES", "5"))  # recomputed each run for late writes
+MONITORING_SAMPLE_RATE = float(os.getenv("MONITORING_SAMPLE_RATE", "1"))  # share of fast successful requests stored
+MONITORING_SAMPLE_RATES = os.getenv("MONITORING_SAMPLE_RATES", "")  # per route prefix, e.g. "/health-check=0,/sample=0.1"
+MONITORING_SLOW_THRESHOLD_MS = float(os.getenv("MONITORING_SLOW_THRESHOLD_MS", "1000"))  # slower requests are always stored
+MONITORING_KEEP_STATUS_FROM = int(os.getenv("MONITORING_KEEP_STATUS_FROM", "400"))  # statuses from this one up are always stored
+MONITORING_TARGET_WRITES_PER_SECOND = float(os.getenv("MONITORING_TARGET_WRITES_PER_SECOND", "0"))  # per worker; 0 = fixed rates
+MONITORING_MIN_SAMPLE_RATE = float(os.getenv("MONITORING_MIN_SAMPLE_RATE", "0.001"))  # floor of the adaptive factor
+
+
+#MySQL connection pools (replica settings default to the primary's)
+MYSQL_REPLICA_CONNECTION_STRINGS = [
+    url.strip() for url in os.getenv("MYSQL_REPLICA_CONNECTION_STRINGS", "").split(",") if url.strip()
+]
+MYSQL_REPLICA_ROUTING = os.getenv("MYSQL_REPLICA_ROUTING", "round_robin")  # round_robin | least_in_use
+
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "40"))
+MYSQL_MAX_OVERFLOW = int(os.getenv("MYSQL_MAX_OVERFLOW", "20"))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "30"))
+MYSQL_POOL_RECYCLE = int(os.getenv("MYSQL_POOL_RECYCLE", "3600"))
+MYSQL_POOL_PRE_PING = _env_flag("MYSQL_POOL_PRE_PING", "true")
+
+MYSQL_REPLICA_POOL_SIZE = int(os.getenv("MYSQL_REPLICA_POOL_SIZE", str(MYSQL_POOL_SIZE)))
+MYSQL_REPLICA_MAX_OVERFLOW = int(os.getenv("MYSQL_REPLICA_MAX_OVERFLOW", str(MYSQL_MAX_OVERFLOW)))
+MYSQL_REPLICA_POOL_TIMEOUT = float(os.getenv("MYSQL_REPLICA_POOL_TIMEOUT", str(MYSQL_POOL_TIMEOUT)))
+MYSQL_REPLICA_POOL_RECYCLE = int(os.getenv("MYSQL_REPLICA_POOL_RECYCLE", str(MYSQL_POOL_RECYCLE)))
+MYSQL_REPLICA_POOL_PRE_PING = _env_flag("MYSQL_REPLICA_POOL_PRE_PING", str(MYSQL_POOL_PRE_PING))
+
+
+#MongoDB connection pool
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0")) or None  # 0 = keep idle connections
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("MONGO_HEARTBEAT_INTERVAL_SECONDS", "10"))
+
+
+#Shared outbound HTTP client (services/apis/http_client.py)
+HTTP_CLIENT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CLIENT_TIMEOUT_SECONDS", "10"))
+HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "200"))
+HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "50"))
+HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_CLIENT_PER_HOST_LIMIT = int(os.getenv("HTTP_CLIENT_PER_HOST_LIMIT", "50"))
+HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", "2"))
+HTTP_CLIENT_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_CLIENT_BACKOFF_BASE_SECONDS", "0.1"))
+HTTP_CLIENT_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_CLIENT_BACKOFF_MAX_SECONDS", "2"))
+HTTP_CLIENT_BREAKER_FAILURES = int(os.getenv("HTTP_CLIENT_BREAKER_FAILURES", "5"))
+HTTP_CLIENT_BREAKER_RESET_SECONDS = float(os.getenv("HTTP_CLIENT_BREAKER_RESET_SECONDS", "30"))
+
+
+#SQL query instrumentation
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))  # identical statements per request
+
+
+#Response cache (utils/response_cache.py)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").strip().lower()  # memory | mongo
+RESPONSE_CACHE_DB_NAME = os.getenv("RESPONSE_CACHE_DB_NAME", "cache")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+
+#Rate limiting (rate_limit.py), per API key and route class
+RATE_LIMIT_ENABLED = _env_flag("RATE_LIMIT_ENABLED")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()  # memory | shared (all workers on the host)
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "120/m:30")  # <count>/<s|m|h>[:<burst>]
+RATE_LIMIT_RULES = os.getenv("RATE_LIMIT_RULES", "")  # per path prefix, e.g. "/llm=10/m:2,/batch=30/m"
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH")  # defaults to /dev/shm/fastapi-rate-limit
+RATE_LIMIT_SHARED_SLOTS = int(os.getenv("RATE_LIMIT_SHARED_SLOTS", "65536"))
+
+
+#Response compression (compression.py): zstd/brotli when installed, else gzip
+COMPRESSION_ENABLED = _env_flag("COMPRESSION_ENABLED", "true")
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))  # bytes
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", "262144"))  # larger bodies compress off the event loop
+
+
+#Readiness probes (/ready)
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+READINESS_PROBE_TIMEOUT_SECONDS = float(os.getenv("READINESS_PROBE_TIMEOUT_SECONDS", "1"))
+READINESS_POOL_SATURATION = float(os.getenv("READINESS_POOL_SATURATION", "0.9"))  # pool utilization reported as degraded
+
+
+#Per-request profiling (profiling.py)
+PROFILING_ENABLED = _env_flag("PROFILING_ENABLED")
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sampling").strip().lower()  # sampling | deterministic
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # fraction of requests profiled
+PROFILING_SECRET = os.getenv("PROFILING_SECRET")  # enables the signed header trigger
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "1"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "log/profiles")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "500"))  # oldest deleted beyond this; 0 = no limit
+PROFILING_MAX_MB = float(os.getenv("PROFILING_MAX_MB", "200"))  # total size of PROFILING_DIR; 0 = no limit
+
+
+#Event loop lag monitor (loop_monitor.py)
+LOOP_MONITOR_ENABLED = _env_flag("LOOP_MONITOR_ENABLED", "true")
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200"))  # stalls longer than this log the loop's stack
+
+
+#Server launcher (server.py)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))  # 0 = one per available CPU
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "65"))  # longer than the load balancer's idle timeout
+SERVER_GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("SERVER_GRACEFUL_SHUTDOWN_SECONDS", "30"))
+SERVER_PROXY_HEADERS = _env_flag("SERVER_PROXY_HEADERS", "true")
+SERVER_FORWARDED_ALLOW_IPS = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")  # set by server.py when running several workers
+METRICS_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("METRICS_SNAPSHOT_INTERVAL_SECONDS", "5"))
+
+
+#Background jobs (services/jobs.py)
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory").strip().lower()  # memory | mongo
+JOB_DB_NAME = os.getenv("JOB_DB_NAME", "jobs")
+JOB_QUEUES = os.getenv("JOB_QUEUES", "default=8,cpu=2")  # queue=concurrent jobs per worker process; the example jobs use both
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "1000"))
+JOB_PROCESS_WORKERS = int(os.getenv("JOB_PROCESS_WORKERS", "2"))  # processes for cpu jobs, 0 = one per CPU
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "10"))
+
+
+#Batch endpoint (routers/batch.py)
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50"))  # sub-requests per batch
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # sub-requests in flight per batch
+
+
+#Pagination and streamed exports (database/pagination.py)
+PAGINATION_DEFAULT_LIMIT = int(os.getenv("PAGINATION_DEFAULT_LIMIT", "50"))
+PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", "500"))
+PAGINATION_CURSOR_SECRET = os.getenv("PAGINATION_CURSOR_SECRET") or API_KEY_PEPPER  # signs cursor tokens; set one in production
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))  # rows fetched per round trip when streaming
+
+
 
 
 
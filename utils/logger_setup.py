@@ -1,14 +1,30 @@
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 import os
 import json
+import queue
 import sys
-from motor.motor_asyncio import AsyncIOMotorDatabase
+import threading
 import asyncio
+from collections import deque
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from dataclasses import dataclass
 
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+_default_formatter = logging.Formatter()
+
+# Maximum number of records waiting for the background log writer thread
+LOG_QUEUE_SIZE = 10000
+
 
 @dataclass
 class MongoLogConfig:
@@ -27,12 +43,40 @@ class MongoLogConfig:
 
 
 class MongoDBHandler(logging.Handler):
-    def __init__(self, db: AsyncIOMotorDatabase, collections: dict):
+    """
+    Logging handler writing records to MongoDB in batches.
+
+    emit() only builds the log entry and appends it to a bounded buffer under
+    a threading lock, so it is safe to call from any thread, with or without
+    a running event loop. A worker task on the loop that called start() drains
+    the buffer and writes one insert_many per level collection, either when
+    `batch_size` entries are waiting or every `flush_interval` seconds. When
+    the buffer is full new entries are dropped and counted in `dropped`.
+    """
+
+    def __init__(
+        self,
+        db: "AsyncIOMotorDatabase",
+        collections: dict,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0
+    ):
         super().__init__()
         self.db = db
         self.collections = collections
-        self._queue = asyncio.Queue()
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+
+        self._buffer = deque()
+        self._buffer_lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
         self._task = None
+        self._closing = False
 
     def _get_collection_name(self, level: int) -> str:
         """Determine collection name based on log level"""
@@ -43,20 +87,40 @@ class MongoDBHandler(logging.Handler):
         else:
             return self.collections["info"]
 
-    async def _worker(self):
-        while True:
+    def _take_batch(self) -> list:
+        with self._buffer_lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    async def _write_batch(self, batch: list):
+        grouped = {}
+        for entry in batch:
+            grouped.setdefault(self._get_collection_name(entry['level_number']), []).append(entry)
+
+        for collection_name, entries in grouped.items():
             try:
-                record = await self._queue.get()
-                if record is None:  # Shutdown signal
-                    break
-                
-                collection_name = self._get_collection_name(record['level_number'])
-                collection = self.db[collection_name]
-                await collection.insert_one(record)
+                await self.db[collection_name].insert_many(entries, ordered=False)
+                self.written += len(entries)
             except Exception as e:
-                print(f"Error writing to MongoDB: {e}", file=sys.stderr)
-            finally:
-                self._queue.task_done()
+                print(f"Error writing {len(entries)} logs to MongoDB: {e}", file=sys.stderr)
+
+    async def _worker(self):
+        while True:
+            if not self._closing and len(self._buffer) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            while batch := self._take_batch():
+                await self._write_batch(batch)
+
+            if self._closing:
+                return
+
+    def _wake(self):
+        self._wakeup.set()
 
     def emit(self, record):
         try:
@@ -72,27 +136,58 @@ class MongoDBHandler(logging.Handler):
             }
             
             if record.exc_info:
-                log_entry["stack_trace"] = self.formatter.formatException(record.exc_info)
+                log_entry["stack_trace"] = (self.formatter or _default_formatter).formatException(record.exc_info)
+
+            with self._buffer_lock:
+                if len(self._buffer) >= self.max_queue_size:
+                    self.dropped += 1
+                    return
+                self._buffer.append(log_entry)
+                size = len(self._buffer)
 
-            asyncio.create_task(self._queue.put(log_entry))
+            if size == self.batch_size and self._loop is not None:
+                # Wake the worker early; call_soon_threadsafe works from any thread
+                try:
+                    self._loop.call_soon_threadsafe(self._wake)
+                except RuntimeError:
+                    # Event loop already closed; the entry stays buffered for stop()
+                    pass
         except Exception as e:
             print(f"Error formatting log for MongoDB: {e}", file=sys.stderr)
 
     async def start(self):
-        """Start the background worker"""
+        """Start the background worker on the running event loop"""
         if self._task is None:
+            self._closing = False
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
             self._task = asyncio.create_task(self._worker())
 
     async def stop(self):
-        """Stop the background worker"""
+        """Stop the background worker after writing every buffered entry"""
         if self._task is not None:
-            await self._queue.put(None)  # Send shutdown signal
+            self._closing = True
+            self._wakeup.set()
             await self._task
             self._task = None
+        while batch := self._take_batch():
+            await self._write_batch(batch)
+        self._loop = None
 
 
 class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON line.
+
+    The result is cached on the record, so when the same record reaches
+    several file handlers sharing this formatter it is encoded only once.
+    """
+
     def format(self, record):
+        cached = getattr(record, "_json_line", None)
+        if cached is not None:
+            return cached
+
         log_record = {
             "timestamp": self.formatTime(record, self.datefmt),
             "level": record.levelname,
@@ -102,11 +197,55 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             log_record["stack_trace"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_record, ensure_ascii=False)
+        if orjson is not None:
+            line = orjson.dumps(log_record, default=str).decode("utf-8")
+        else:
+            line = json.dumps(log_record, ensure_ascii=False, default=str)
+        record._json_line = line
+        return line
 
 
-def setup_handler(log_file, level):
-    formatter = JsonFormatter()
+class LogQueueHandler(QueueHandler):
+    """
+    Hands records to the background listener thread.
+
+    The stock QueueHandler formats every record on the calling thread in
+    prepare(); here only the message is resolved so the JSON encoding and
+    file writes happen on the listener thread. When the bounded queue is full
+    the record is dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogQueueListener(QueueListener):
+    """
+    QueueListener whose stop() waits for room in a full queue.
+
+    The stock listener enqueues its stop sentinel with put_nowait(), which
+    raises queue.Full when shutdown happens under load. The listener thread
+    keeps draining the queue, so a blocking put always gets through.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_handler(log_file, level, formatter: Optional[logging.Formatter] = None):
+    formatter = formatter or JsonFormatter()
     handler = TimedRotatingFileHandler(
         log_file, when="midnight", interval=1, backupCount=30
     )
@@ -120,52 +259,69 @@ def create_log_directories():
     if not os.path.exists(base_path):
         os.makedirs(base_path)
 
-    log_paths = [f"{base_path}/info", f"{base_path}/warning", f"{base_path}/error"]
+    log_paths = [f"{base_path}/info", f"{base_path}/warning", f"{base_path}/error", f"{base_path}/profiles"]
     for path in log_paths:
         os.makedirs(path, exist_ok=True)
 
 
-async def initialize_logger(db_name: str, mongo_config: Optional[MongoLogConfig] = None):
+async def initialize_logger(db_name: str, mongo_config: Optional[MongoLogConfig] = None, use_mongo: bool = True,
+                            use_files: bool = True):
     """
     Initialize logger with MongoDB support
     
     Args:
         db_name: Name of the MongoDB database to use
         mongo_config: Optional configuration for collection names
+        use_mongo: Set to False for file logging only (Mongo is then never imported)
+        use_files: Set to False for MongoDB logging only (no log files are written)
     """
-    from ..database.mongo import get_database  # Import your existing database function
     
-    create_log_directories()
+    if use_files:
+        create_log_directories()
     
     logger = logging.getLogger("AppLogger")
     logger.propagate = False
     logger.setLevel(logging.DEBUG)
 
-    if info_handler := setup_handler("log/info/info.log", logging.INFO):
-        logger.addHandler(info_handler)
-
-    if warning_handler := setup_handler("log/warning/warning.log", logging.WARNING):
-        logger.addHandler(warning_handler)
+    # One shared formatter so a record going to several files is encoded once
+    formatter = JsonFormatter()
+    handlers = []
 
-    if error_handler := setup_handler("log/error/error.log", logging.ERROR):
-        logger.addHandler(error_handler)
+    if use_files:
+        handlers.append(setup_handler("log/info/info.log", logging.INFO, formatter))
+        handlers.append(setup_handler("log/warning/warning.log", logging.WARNING, formatter))
+        handlers.append(setup_handler("log/error/error.log", logging.ERROR, formatter))
 
     # Add MongoDB handler
-    try:
-        db = await get_database(db_name)
-        if mongo_config is None:
-            mongo_config = MongoLogConfig()  # Use default collection names
-            
-        mongo_handler = MongoDBHandler(db, mongo_config.collections)
-        mongo_handler.setLevel(logging.INFO)
-        logger.addHandler(mongo_handler)
-        await mongo_handler.start()
-        
-        # Store the MongoDB handler reference for cleanup
-        logger.mongo_handler = mongo_handler
-    except Exception as e:
-        print(f"Failed to initialize MongoDB logging: {e}")
-        # Continue with file logging only
+    if use_mongo:
+        try:
+            from database.mongo import get_database  # Import your existing database function
+
+            db = await get_database(db_name)
+            if mongo_config is None:
+                mongo_config = MongoLogConfig()  # Use default collection names
+
+            mongo_handler = MongoDBHandler(db, mongo_config.collections)
+            mongo_handler.setLevel(logging.INFO)
+            handlers.append(mongo_handler)
+            await mongo_handler.start()
+
+            # Store the MongoDB handler reference for cleanup
+            logger.mongo_handler = mongo_handler
+        except Exception as e:
+            print(f"Failed to initialize MongoDB logging: {e}")
+            # Continue with file logging only
+
+    # The logger itself only enqueues; formatting and all writes happen on
+    # the listener thread so logging never blocks the event loop.
+    queue_handler = LogQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_listener = LogQueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    queue_listener.start()
+    logger.addHandler(queue_handler)
+
+    # Store the queue references for cleanup
+    logger.queue_handler = queue_handler
+    logger.queue_listener = queue_listener
 
     return logger
 
@@ -175,7 +331,16 @@ def get_logger():
 
 
 async def cleanup_logger():
-    """Cleanup function to properly shut down the MongoDB handler"""
+    """Cleanup function to drain the log queue and shut down the MongoDB handler"""
     logger = get_logger()
+    if hasattr(logger, 'queue_listener'):
+        logger.removeHandler(logger.queue_handler)
+        # stop() processes everything still queued before joining the thread
+        await asyncio.to_thread(logger.queue_listener.stop)
+        for handler in logger.queue_listener.handlers:
+            handler.close()
+        del logger.queue_listener
+        del logger.queue_handler
     if hasattr(logger, 'mongo_handler'):
-        await logger.mongo_handler.stop()
\ No newline at end of file
+        await logger.mongo_handler.stop()
+        del logger.mongo_handler
\ No newline at end of file
@@ -0,0 +1,305 @@
+import functools
+import hashlib
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+
+from metrics import CounterFamily, GaugeFamily, metrics_registry
+from utils.cache import SingleFlight, TTLCache
+from utils.responses import FastJSONResponse
+from utils.config_loader import (
+    API_KEY_HEADER_NAME,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_DB_NAME,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_ENTRIES,
+)
+
+
+CACHEABLE_METHODS = frozenset({"GET", "HEAD"})
+
+# Never copied into a cached entry: recomputed per response or per client
+_SKIP_HEADERS = frozenset({"content-length", "etag", "cache-control", "x-cache", "date", "server"})
+
+
+class ResponseCacheBackend:
+    """
+    Storage for cached responses. An entry is a plain dict (status_code,
+    headers, body, etag), so backends only need to store and return it.
+    """
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError()
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        raise NotImplementedError()
+
+    async def delete(self, key: str):
+        raise NotImplementedError()
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class InMemoryBackend(ResponseCacheBackend):
+    """Per-process LRU + TTL store, bounded by max_entries."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.cache = TTLCache(max_entries=max_entries)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        self.cache.set(key, entry, ttl=ttl)
+
+    async def delete(self, key: str):
+        self.cache.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.cache),
+            "evictions": self.cache.stats["evictions"],
+            "expirations": self.cache.stats["expirations"],
+        }
+
+
+class MongoBackend(ResponseCacheBackend):
+    """
+    Cache shared by all workers, stored in a MongoDB collection. Expired
+    documents are filtered on read and removed by a TTL index.
+    """
+
+    def __init__(self, db_name: str, collection_name: str = "response_cache"):
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self._indexed = False
+
+    async def _collection(self):
+        from database.mongo import get_collection
+
+        collection = await get_collection(self.db_name, self.collection_name)
+        if not self._indexed:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        from datetime import datetime
+
+        collection = await self._collection()
+        document = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        if document is None:
+            return None
+        document["headers"] = [tuple(header) for header in document["headers"]]
+        return document
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        from datetime import datetime, timedelta
+
+        collection = await self._collection()
+        document = dict(entry, expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+        await collection.replace_one({"_id": key}, document, upsert=True)
+
+    async def delete(self, key: str):
+        collection = await self._collection()
+        await collection.delete_one({"_id": key})
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _storable(entry: Dict[str, Any]) -> bool:
+    return entry["status_code"] == 200 and not any(name == "set-cookie" for name, _ in entry["headers"])
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Caches whole responses of GET endpoints.
+
+    The key is built from the method, path, sorted query string and the
+    values of `vary_headers` (by default the API key header, so clients never
+    see each other's data). Each response gets an ETag; a request whose
+    If-None-Match matches is answered with 304 and no body. On a miss,
+    concurrent requests for the same key wait for one computation
+    (single flight) instead of all running the endpoint.
+
+    Only 200 responses with a body are stored; streaming responses and
+    responses setting cookies pass through untouched.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        backend: Optional[ResponseCacheBackend] = None,
+        ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+        vary_headers: Sequence[str] = (API_KEY_HEADER_NAME,) if API_KEY_HEADER_NAME else ()
+    ):
+        self.name = name
+        self.backend = backend or InMemoryBackend()
+        self.ttl = ttl
+        self.vary_headers = tuple(header.lower() for header in vary_headers)
+        self.single_flight = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "not_modified": 0, "uncacheable": 0}
+        _caches.append(self)
+
+    def build_key(self, request: Request, vary_headers: Optional[Sequence[str]] = None) -> str:
+        headers = self.vary_headers if vary_headers is None else tuple(h.lower() for h in vary_headers)
+        parts = [request.method, request.url.path, "&".join(sorted(request.url.query.split("&")))]
+        parts.extend(f"{name}={request.headers.get(name, '')}" for name in headers)
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, **self.backend.stats())
+
+    async def invalidate(self, key: str):
+        await self.backend.delete(key)
+
+    @staticmethod
+    def _to_entry(response: Response) -> Dict[str, Any]:
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response.raw_headers
+            if name.decode("latin-1") not in _SKIP_HEADERS
+        ]
+        return {
+            "status_code": response.status_code,
+            "headers": headers,
+            "body": response.body,
+            "etag": _etag(response.body),
+        }
+
+    def _from_entry(self, entry: Dict[str, Any], request: Request, ttl: float, state: str) -> Response:
+        headers = {"X-Cache": state}
+        # Responses that were not stored get no validators: clients must not reuse them either
+        storable = _storable(entry)
+        if storable:
+            headers.update({"ETag": entry["etag"], "Cache-Control": f"private, max-age={int(ttl)}"})
+        if_none_match = request.headers.get("if-none-match")
+        if storable and if_none_match and _etag_matches(if_none_match, entry["etag"]):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        response = Response(content=entry["body"], status_code=entry["status_code"])
+        # Appended raw so repeated headers (e.g. Link) survive
+        response.raw_headers.extend(
+            (name.encode("latin-1"), value.encode("latin-1")) for name, value in entry["headers"]
+        )
+        for name, value in headers.items():
+            response.headers[name] = value
+        return response
+
+    def cached(self, ttl: Optional[float] = None, vary_headers: Optional[Sequence[str]] = None):
+        """
+        Decorator for a route function, placed below the router decorator:
+
+            @router.get("/items")
+            @response_cache.cached(ttl=30)
+            async def list_items(): ...
+
+        Plain return values are encoded as JSON, like FastAPI does without a
+        response_model. The endpoint keeps its own parameters; a Request
+        parameter is added to the signature if it does not have one.
+        """
+
+        def decorator(func: Callable):
+            signature = inspect.signature(func)
+            request_param = next(
+                (p.name for p in signature.parameters.values() if p.annotation is Request), None
+            )
+            parameters = list(signature.parameters.values())
+            if request_param is None:
+                parameters.append(inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+            is_coroutine = inspect.iscoroutinefunction(func)
+            entry_ttl = self.ttl if ttl is None else ttl
+
+            async def call(args, kwargs):
+                if is_coroutine:
+                    return await func(*args, **kwargs)
+                return await run_in_threadpool(func, *args, **kwargs)
+
+            async def compute(args, kwargs, key):
+                result = await call(args, kwargs)
+                if isinstance(result, StreamingResponse):
+                    return result
+                if not isinstance(result, Response):
+                    result = FastJSONResponse(jsonable_encoder(result))
+                entry = self._to_entry(result)
+                if _storable(entry):
+                    await self.backend.set(key, entry, entry_ttl)
+                else:
+                    self.stats["uncacheable"] += 1
+                return entry
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs[request_param] if request_param else kwargs.pop("_cache_request")
+                if request.method not in CACHEABLE_METHODS:
+                    return await call(args, kwargs)
+
+                key = self.build_key(request, vary_headers)
+                entry = await self.backend.get(key)
+                if entry is not None:
+                    self.stats["hits"] += 1
+                    return self._from_entry(entry, request, entry_ttl, "HIT")
+
+                leader = not self.single_flight.in_flight(key)
+                self.stats["misses" if leader else "coalesced"] += 1
+                result = await self.single_flight.do(key, lambda: compute(args, kwargs, key))
+                if isinstance(result, Response):
+                    # A streaming body can only be sent once; other waiters compute their own
+                    self.stats["uncacheable"] += 1
+                    return result if leader else await call(args, kwargs)
+                return self._from_entry(result, request, entry_ttl, "MISS")
+
+            wrapper.__signature__ = signature.replace(parameters=parameters)
+            return wrapper
+
+        return decorator
+
+
+_caches: List[ResponseCache] = []
+
+
+def _response_cache_metrics() -> List[str]:
+    events = CounterFamily("response_cache_events_total", "Response cache lookups by outcome", ("cache", "event"))
+    entries = GaugeFamily("response_cache_entries", "Entries held by in-memory response caches", ("cache",))
+    for cache in _caches:
+        stats = cache.get_stats()
+        for event in ("hits", "misses", "coalesced", "not_modified", "uncacheable", "evictions", "expirations"):
+            if event in stats:
+                events.inc((cache.name, event), stats[event])
+        if "entries" in stats:
+            entries.set((cache.name,), stats["entries"])
+    return events.render() + entries.render()
+
+
+metrics_registry.register_collector(_response_cache_metrics)
+
+def build_cache_backend(backend: str = RESPONSE_CACHE_BACKEND) -> ResponseCacheBackend:
+    """Backend named by RESPONSE_CACHE_BACKEND: "memory" (per process) or "mongo" (shared)."""
+    if backend == "memory":
+        return InMemoryBackend()
+    if backend == "mongo":
+        return MongoBackend(RESPONSE_CACHE_DB_NAME)
+    raise ValueError(f"RESPONSE_CACHE_BACKEND must be 'memory' or 'mongo', got {backend!r}")
+
+
+response_cache = ResponseCache(backend=build_cache_backend())
+cached = response_cache.cached
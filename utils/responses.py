@@ -0,0 +1,78 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from fastapi.encoders import ENCODERS_BY_TYPE
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """
+    Fallback for types the encoder does not know. bson is not imported here
+    (it is slow to import); ObjectId is recognised by name and sent as its
+    hex string.
+    """
+    if type(obj).__name__ == "ObjectId":
+        return str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (UUID, Decimal)):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        # datetime, date, UUID and dataclasses are handled natively by orjson
+        return orjson.dumps(content, default=json_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content, default=json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson (stdlib json when orjson is missing).
+
+    Set as the app's default_response_class. Routes returning large payloads
+    can return FastJSONResponse(data) directly: that skips FastAPI's
+    jsonable_encoder pass, and datetimes and ObjectIds are encoded natively.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def register_bson_encoders():
+    """
+    Let jsonable_encoder (used for plain route return values) handle
+    ObjectId. Called once the Mongo driver is loaded, since that already
+    imports bson.
+    """
+    from bson import ObjectId
+
+    ENCODERS_BY_TYPE.setdefault(ObjectId, str)